@@ -0,0 +1,169 @@
+import numpy as np
+
+class _IVFIndex():
+    """Inverted-file index for approximate neighbor search.
+
+    A coarse k-means quantizer splits the training rows into n_lists
+    cells. Every cell keeps the indices of its rows in a CSR-style pair
+    of arrays (list_ptr, list_ind). A query only scans the rows of its
+    n_probes closest cells, so more probes trade speed for recall.
+
+    Parameters
+    ----------
+    X : ndarray of shape (n_samples, n_features)
+        Training data. The index keeps a reference, not a copy.
+
+    p : int
+        Power parameter for the Minkowski metric (1 or 2).
+
+    n_lists : int or None
+        Number of cells. None means sqrt(n_samples).
+
+    n_probes : int
+        Number of closest cells scanned per query.
+
+    random_state : int or None
+        Seed of the k-means initialization and training subsample.
+
+    n_iter : int, default=10
+        Number of Lloyd iterations of the coarse quantizer.
+    """
+    def __init__(self,
+                X:np.array,
+                p:int,
+                n_lists:int or None,
+                n_probes:int,
+                random_state:int or None,
+                n_iter:int=10):
+        self._X = X
+        self._p = p
+        n_samples = X.shape[0]
+        self.n_lists = min(n_lists or max(1, int(np.sqrt(n_samples))), n_samples)
+        self.n_probes = min(n_probes, self.n_lists)
+        rng = np.random.default_rng(random_state)
+        # train the quantizer on a subsample, it only has to roughly cover the data
+        train_rows = rng.choice(n_samples, size=min(n_samples, 256 * self.n_lists), replace=False)
+        train = X[np.sort(train_rows)]
+        self.centroids = train[rng.choice(train.shape[0], size=self.n_lists, replace=False)].astype(np.float64)
+        for _ in range(n_iter):
+            assign = self.__assign(points=train)
+            counts = np.bincount(assign, minlength=self.n_lists)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assign, train)
+            filled = counts > 0
+            self.centroids[filled] = sums[filled] / counts[filled, None]
+        # inverted lists of all training rows
+        self.assign = self.__assign(points=X)
+        self.__build_lists()
+
+    def __build_lists(self):
+        '''Function to group row indices by cell in CSR layout
+        '''
+        self.list_ind = np.argsort(self.assign, kind='stable')
+        self.list_ptr = np.concatenate(([0], np.cumsum(np.bincount(self.assign, minlength=self.n_lists))))
+
+    def add(self,
+            first_row:int):
+        """Function to index rows appended to X from first_row on
+
+        New rows are assigned to their closest cell, the quantizer is not
+        retrained.
+
+        Args:
+            first_row : first row of X that is not indexed yet
+        """
+        self.assign = np.concatenate((self.assign[:first_row], self.__assign(points=self._X[first_row:])))
+        self.__build_lists()
+
+    def __centroid_distances(self,
+                            points:np.array)->np.ndarray:
+        '''Function to compute squared euclidean distances to every centroid
+        '''
+        c_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        distances = np.einsum('ij,ij->i', points, points)[:, None] + c_norms[None, :] - 2 * (points @ self.centroids.T)
+        return distances
+
+    def __assign(self,
+                points:np.array,
+                block_size:int=65536)->np.ndarray:
+        '''Function to find the closest centroid of every point in blocks
+        '''
+        assign = np.empty(points.shape[0], dtype=np.intp)
+        for start in range(0, points.shape[0], block_size):
+            block = np.asarray(points[start:start+block_size], dtype=np.float64)
+            assign[start:start+block_size] = self.__centroid_distances(points=block).argmin(axis=1)
+        return assign
+
+    def _distances(self,
+                    x:np.array,
+                    points:np.array)->np.ndarray:
+        '''Function to compute minkowski distances from x to every point
+        '''
+        if self._p == 2:
+            return np.sqrt(np.sum((points - x)**2, axis=1))
+        return np.sum(np.abs(points - x), axis=1)
+
+    def query(self,
+                X:np.array,
+                k:int,
+                alive:np.array or None=None):
+        """Function to find approximately the k nearest training rows of every query
+
+        Cells are scanned in order of centroid distance until n_probes cells
+        were scanned and at least k alive candidates were seen.
+
+        Args:
+            X : ndarray of shape (n_queries, n_features)
+            k : number of neighbors, k <= number of alive rows
+            alive : boolean mask of rows that may be returned, None means all
+
+        Returns:
+            (ndarray, ndarray): sorted distances and training indices,
+            both of shape (n_queries, k)
+        """
+        neigh_dist = np.empty((X.shape[0], k))
+        neigh_ind = np.empty((X.shape[0], k), dtype=np.intp)
+        # removed rows are not counted as candidates
+        sizes = np.diff(self.list_ptr) if alive is None else np.bincount(self.assign[alive], minlength=self.n_lists)
+        probe_order = np.argsort(self.__centroid_distances(points=X), axis=1)
+        for row, x in enumerate(X):
+            cells = probe_order[row]
+            n_cells = max(self.n_probes, np.searchsorted(np.cumsum(sizes[cells]), k) + 1)
+            inds = np.concatenate([self.list_ind[self.list_ptr[c]:self.list_ptr[c+1]] for c in cells[:n_cells]])
+            if alive is not None:
+                inds = inds[alive[inds]]
+            distances = self._distances(x=x, points=self._X[inds])
+            top = np.argpartition(distances, k-1)[:k] if k < len(inds) else np.arange(len(inds))
+            top = top[np.argsort(distances[top], kind='stable')]
+            neigh_dist[row], neigh_ind[row] = distances[top], inds[top]
+        return neigh_dist, neigh_ind
+
+    def query_radius(self,
+                    X:np.array,
+                    radius:float,
+                    alive:np.array or None=None):
+        """Function to find approximately all training rows within radius of every query
+
+        Only the rows of the n_probes closest cells are scanned.
+
+        Args:
+            X : ndarray of shape (n_queries, n_features)
+            radius : maximum distance of a neighbor
+            alive : boolean mask of rows that may be returned, None means all
+
+        Returns:
+            (list, list): per query arrays of distances and training
+            indices, sorted by increasing distance
+        """
+        neigh_dist, neigh_ind = [], []
+        probe_order = np.argsort(self.__centroid_distances(points=X), axis=1)[:, :self.n_probes]
+        for row, x in enumerate(X):
+            inds = np.concatenate([self.list_ind[self.list_ptr[c]:self.list_ptr[c+1]] for c in probe_order[row]])
+            if alive is not None:
+                inds = inds[alive[inds]]
+            distances = self._distances(x=x, points=self._X[inds])
+            mask = distances <= radius
+            order = np.argsort(distances[mask], kind='stable')
+            neigh_dist.append(distances[mask][order])
+            neigh_ind.append(inds[mask][order])
+        return neigh_dist, neigh_ind
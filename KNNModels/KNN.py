@@ -1,6 +1,26 @@
+import os
+import tempfile
+import weakref
 import numpy as np
 import pandas as pd
-from scipy.stats import mode
+from concurrent.futures import ThreadPoolExecutor
+from SpatialTree import _KDTree, _BallTree
+from IVFIndex import _IVFIndex
+
+def _load_array(X:pd.DataFrame or np.array or str)->np.ndarray:
+    """Function to open a .npy path as a read-only memmap, other X pass through
+    """
+    if isinstance(X, (str, os.PathLike)):
+        return np.load(X, mmap_mode='r')
+    return X
+
+def _remove_file(path:str):
+    """Function to delete a buffer file, a file that is still mapped elsewhere stays
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
 def _df_np_check(func):
     """Decorator for check X argument
@@ -11,6 +31,10 @@ def _df_np_check(func):
             assert \
             len(key) > 0, \
             'Argument X must be only pandas DataFrame and not empty'
+        elif isinstance(key, (str, os.PathLike)):
+            assert \
+            os.path.isfile(key), \
+            'Argument X must be only path to an existing .npy file'
         else:
             raise Exception('Argument X must be only pandas DataFrame')
         return func(*args, **kwargs)
@@ -20,67 +44,637 @@ class _KNNTools():
     def __init__(self,
                 n_neighbors:int,
                 p:int,
-                X_train:np.array or None = None,
-                y_train:np.array or None = None):
+                tile_size:int=256,
+                algorithm:str='brute',
+                leaf_size:int=30,
+                approximate:bool=False,
+                n_lists:int or None=None,
+                n_probes:int=8,
+                random_state:int or None=None,
+                n_jobs:int or None=None,
+                block_size:int or None=None,
+                dtype:str='float64',
+                quantize:str or None=None,
+                rerank:int or None=None):
         self.__n_neighbors = n_neighbors
         self.__p = p
-        self.__X_train = X_train
-        self.__y_train = y_train
+        self.__tile_size = tile_size
+        self.__algorithm = algorithm
+        self.__leaf_size = leaf_size
+        self.__approximate = approximate
+        self.__n_lists = n_lists
+        self.__n_probes = n_probes
+        self.__random_state = random_state
+        self.__n_jobs = n_jobs
+        self.__block_size = block_size
+        self.__dtype = dtype
+        self.__quantize = quantize
+        self.__rerank = rerank
+        self.__X_train = None
+        self.__X_full = None
+        self.__y_train = None
+        self.__sq_norms = None
+        self.__index = None
+        self.__n_rows = 0
+        self.__n_dead = 0
+        self.__n_indexed = 0
+        # buffer files created by the model, deleted when replaced or with the model
+        self.__own_files = {}
+        self.__source_file = None
 
-    def _find_neighbors(self, x):
-        """Function to find the K nearest neighbors to current test example 
+    def _find_neighbors(self, 
+                        X:np.array, 
+                        return_distance:bool=False):
+        """Function to find the K nearest neighbors to every test example
 
         Parameters
         ----------
-        x : array-like of shape (n_queries, n_features)
+        X : array-like of shape (n_queries, n_features)
             Test samples.
 
+        return_distance : bool, default=False
+            Whether to also return the neighbor distances.
+
         Returns:
-            ndarray: k nearest neighbors
-        """
-        # calculate all the minkowski distances between current 
-        euclidean_distances = np.zeros(self.__X_train.shape[0])
-        for ind, query in enumerate(self.__X_train):
-            d = self._minkowski(x, query)
-            euclidean_distances[ind] = d
-        # sort Y_train according to euclidean_distance_array and 
-        # store into Y_train_sorted
-        inds = euclidean_distances.argsort()
-        Y_train_sorted = self.__y_train[inds]
-        if self.__n_neighbors > len(Y_train_sorted):
-            self.__n_neighbors = len(Y_train_sorted)-1
-        return Y_train_sorted[:self.__n_neighbors]
-    
-    def _minkowski(self, x, x_train):
+            ndarray: targets of the k nearest neighbors, shape (n_queries, k),
+            preceded by their distances if return_distance=True
+        """
+        dist, inds = self._kneighbors(X)
+        return (dist, self.__y_train[inds]) if return_distance else self.__y_train[inds]
+
+    def _kneighbors(self, 
+                    X:np.array, 
+                    n_neighbors:int or None=None):
+        """Function to find distances and indices of the K nearest neighbors
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        n_neighbors : int or None, default=None
+            Number of neighbors. None means the n_neighbors of the model.
+
+        Returns:
+            (ndarray, ndarray): distances and training rows of the
+            k nearest neighbors, both of shape (n_queries, k) and sorted
+            by increasing distance
+        """
+        n_neighbors = min(n_neighbors or self.__n_neighbors, self.__n_rows - self.__n_dead)
+        results = self._map_queries(search=lambda chunk: self.__search_kneighbors(X=chunk, 
+                                                                                n_neighbors=n_neighbors), 
+                                    X=X)
+        return np.concatenate([dist for dist, _ in results]), np.concatenate([ind for _, ind in results])
+
+    def __search_kneighbors(self, 
+                            X:np.array, 
+                            n_neighbors:int):
+        """Function to search the K nearest neighbors with the configured algorithm
+
+        Rows appended after the index was built are searched by brute force
+        and merged with the index result.
+        """
+        if self.__index is None and self.__rerank:
+            return self.__rerank_kneighbors(X=X, 
+                                            n_neighbors=n_neighbors)
+        if self.__index is None:
+            return self._brute_kneighbors(X=X, 
+                                        n_neighbors=n_neighbors)
+        neigh_dist, neigh_ind = self.__index.query(X=X, 
+                                                    k=min(n_neighbors, self.__n_indexed), 
+                                                    alive=self.__alive_rows())
+        if self.__n_indexed == self.__n_rows:
+            return neigh_dist, neigh_ind
+        tail_dist, tail_ind = self._brute_kneighbors(X=X, 
+                                                    n_neighbors=min(n_neighbors, self.__n_rows - self.__n_indexed), 
+                                                    first_row=self.__n_indexed)
+        neigh_dist, order = self._top_k(distances=np.concatenate((neigh_dist, tail_dist), axis=1), 
+                                        k=n_neighbors)
+        return neigh_dist, np.take_along_axis(np.concatenate((neigh_ind, tail_ind), axis=1), order, axis=1)
+
+    def __rerank_kneighbors(self, 
+                            X:np.array, 
+                            n_neighbors:int):
+        """Function to re-rank compact-precision candidates in full precision
+
+        rerank * n_neighbors candidates are found with the compact reference
+        matrix, their distances are recomputed on the full-precision rows.
+        """
+        n_candidates = min(n_neighbors * self.__rerank, self.__n_rows - self.__n_dead)
+        cand_dist, cand_ind = self._brute_kneighbors(X=X, 
+                                                    n_neighbors=n_candidates)
+        for start in range(0, X.shape[0], self.__tile_size):
+            stop = start + self.__tile_size
+            rows = np.asarray(self.__X_full[cand_ind[start:stop].ravel()], dtype=np.float64)
+            diff = rows.reshape(cand_ind[start:stop].shape + (-1,)) - X[start:stop, None, :]
+            cand_dist[start:stop] = np.sqrt(np.sum(diff**2, axis=2)) if self.__p == 2 else np.sum(np.abs(diff), axis=2)
+        neigh_dist, order = self._top_k(distances=cand_dist, 
+                                        k=n_neighbors)
+        return neigh_dist, np.take_along_axis(cand_ind, order, axis=1)
+
+    def _radius_neighbors(self, 
+                        X:np.array, 
+                        radius:float):
+        """Function to find all neighbors within radius of every test example
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        radius : float
+            Maximum distance of a neighbor.
+
+        Returns:
+            (ndarray, ndarray, ndarray): CSR-style indptr of shape
+            (n_queries + 1,), training rows and distances. Neighbors of
+            query i are indices[indptr[i]:indptr[i+1]], sorted by distance.
+        """
+        neigh_dist, neigh_ind = [], []
+        for dist, ind in self._map_queries(search=lambda chunk: self.__search_radius_neighbors(X=chunk, 
+                                                                                            radius=radius), 
+                                            X=X):
+            neigh_dist += dist
+            neigh_ind += ind
+        indptr = np.concatenate(([0], np.cumsum([len(ind) for ind in neigh_ind]))).astype(np.intp)
+        if len(neigh_ind) == 0:
+            return indptr, np.zeros(0, dtype=np.intp), np.zeros(0)
+        return indptr, np.concatenate(neigh_ind).astype(np.intp), np.concatenate(neigh_dist)
+
+    def __search_radius_neighbors(self, 
+                                X:np.array, 
+                                radius:float):
+        """Function to search neighbors within radius with the configured algorithm
+        """
+        if self.__index is None:
+            return self._brute_radius_neighbors(X=X, 
+                                                radius=radius)
+        neigh_dist, neigh_ind = self.__index.query_radius(X=X, 
+                                                        radius=radius, 
+                                                        alive=self.__alive_rows())
+        if self.__n_indexed == self.__n_rows:
+            return neigh_dist, neigh_ind
+        tail_dist, tail_ind = self._brute_radius_neighbors(X=X, 
+                                                            radius=radius, 
+                                                            first_row=self.__n_indexed)
+        for query in range(X.shape[0]):
+            dist = np.concatenate((neigh_dist[query], tail_dist[query]))
+            order = np.argsort(dist, kind='stable')
+            neigh_dist[query] = dist[order]
+            neigh_ind[query] = np.concatenate((neigh_ind[query], tail_ind[query]))[order]
+        return neigh_dist, neigh_ind
+
+    def _map_queries(self, 
+                    search, 
+                    X:np.array)->list:
+        """Function to run a neighbor search over the test samples
+
+        With n_jobs other than 1 the queries are sharded tile by tile over
+        a thread pool, the NumPy kernels release the GIL.
+
+        Parameters
+        ----------
+        search : callable
+            Search over a block of test samples.
+
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        Returns:
+            list: search results of the consecutive blocks
+        """
+        X = np.asarray(X, dtype=np.float64)
+        n_jobs = self.__n_jobs or 1
+        if n_jobs < 0:
+            n_jobs = os.cpu_count()
+        if n_jobs == 1 or X.shape[0] <= self.__tile_size:
+            return [search(X)]
+        chunks = [X[start:start+self.__tile_size] for start in range(0, X.shape[0], self.__tile_size)]
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            return list(executor.map(search, chunks))
+
+    def _brute_kneighbors(self, 
+                            X:np.array, 
+                            n_neighbors:int,
+                            first_row:int=0):
+        """Function to find the exact K nearest neighbors with the tiled kernel
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        n_neighbors : int
+            Number of neighbors, at most the number of searched rows.
+
+        first_row : int, default=0
+            Only training rows from first_row on are searched.
+
+        Returns:
+            (ndarray, ndarray): sorted distances and training rows,
+            both of shape (n_queries, n_neighbors)
+        """
+        neigh_dist = np.full((X.shape[0], n_neighbors), np.inf)
+        neigh_ind = np.zeros((X.shape[0], n_neighbors), dtype=np.intp)
+        for start, train_start, distances in self._distance_tiles(X=X, 
+                                                                first_row=first_row):
+            stop = start + len(distances)
+            block_dist, block_ind = self._top_k(distances=distances, 
+                                                k=min(n_neighbors, distances.shape[1]))
+            # release the tile before the generator computes the next one
+            del distances
+            if train_start == first_row:
+                neigh_dist[start:stop, :block_dist.shape[1]] = block_dist
+                neigh_ind[start:stop, :block_ind.shape[1]] = block_ind + train_start
+                continue
+            # merge the running neighbors with the best rows of the new block
+            cand_dist = np.concatenate((neigh_dist[start:stop], block_dist), axis=1)
+            cand_ind = np.concatenate((neigh_ind[start:stop], block_ind + train_start), axis=1)
+            cand_dist, order = self._top_k(distances=cand_dist, 
+                                            k=n_neighbors)
+            neigh_dist[start:stop] = cand_dist
+            neigh_ind[start:stop] = np.take_along_axis(cand_ind, order, axis=1)
+        return neigh_dist, neigh_ind
+
+    def _brute_radius_neighbors(self, 
+                                X:np.array, 
+                                radius:float,
+                                first_row:int=0):
+        """Function to find all neighbors within radius with the tiled kernel
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        radius : float
+            Maximum distance of a neighbor.
+
+        first_row : int, default=0
+            Only training rows from first_row on are searched.
+
+        Returns:
+            (list, list): per query arrays of distances and training
+            rows, sorted by increasing distance
+        """
+        rows, cols, dists = [], [], []
+        for start, train_start, distances in self._distance_tiles(X=X, 
+                                                                first_row=first_row):
+            row, col = np.nonzero(distances <= radius)
+            rows.append(row + start)
+            cols.append(col + train_start)
+            dists.append(distances[row, col])
+            del distances
+        rows, cols, dists = np.concatenate(rows), np.concatenate(cols), np.concatenate(dists)
+        order = np.lexsort((dists, rows))
+        bounds = np.searchsorted(rows[order], np.arange(X.shape[0] + 1))
+        cols, dists = cols[order], dists[order]
+        neigh_dist = [dists[bounds[i]:bounds[i+1]] for i in range(X.shape[0])]
+        neigh_ind = [cols[bounds[i]:bounds[i+1]] for i in range(X.shape[0])]
+        return neigh_dist, neigh_ind
+
+    def _estimate_recall(self, 
+                        X:np.array, 
+                        rows:np.array or None=None)->float:
+        """Function to estimate recall of the neighbor index against brute force
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        rows : ndarray of shape (n_queries,) or None
+            Training rows the queries were taken from. Each query is then
+            excluded from its own neighbor lists.
+
+        Returns:
+            float: mean fraction of the exact k nearest neighbors found
+        """
+        n_neighbors = min(self.__n_neighbors, self.__n_rows - self.__n_dead - (rows is not None))
+        k = n_neighbors + (rows is not None)
+        X = np.asarray(X, dtype=np.float64)
+        _, approx_ind = self.__search_kneighbors(X=X, 
+                                                n_neighbors=k)
+        _, exact_ind = self._brute_kneighbors(X=X, 
+                                            n_neighbors=k)
+        found = 0
+        for query in range(X.shape[0]):
+            approx, exact = approx_ind[query], exact_ind[query]
+            if rows is not None:
+                approx, exact = approx[approx != rows[query]], exact[exact != rows[query]]
+            found += len(np.intersect1d(approx[:n_neighbors], exact[:n_neighbors]))
+        return found / (X.shape[0] * n_neighbors)
+
+    def _row_ids(self, 
+                rows:np.array)->np.ndarray:
+        """Function to map training rows to the ids given at fit/partial_fit
+
+        Ids are positions in the order samples were added, they stay
+        stable when removed samples are compacted away.
+        """
+        return self.__ids[rows]
+
+    @staticmethod
+    def __blocks(X:np.array, 
+                block_size:int=65536):
+        """Generator over row blocks of X
+        """
+        for start in range(0, X.shape[0], block_size):
+            yield np.asarray(X[start:start+block_size])
+
+    @staticmethod
+    def _top_k(distances:np.array, 
+                k:int):
+        """Function to select the k smallest distances of every row
+
+        A partial selection with np.argpartition is O(n_samples) per row,
+        only the k selected candidates are sorted afterwards. Rows are
+        selected in chunks, so the index array of np.argpartition stays
+        small next to the distance tile.
+
+        Args:
+            distances : ndarray of shape (n_queries, n_samples)
+            k : number of neighbors, k <= n_samples
+
+        Returns:
+            (ndarray, ndarray): sorted distances and their column indices,
+            both of shape (n_queries, k)
+        """
+        if k < distances.shape[1]:
+            inds = np.empty((distances.shape[0], k), dtype=np.intp)
+            for start in range(0, distances.shape[0], 16):
+                inds[start:start+16] = np.argpartition(distances[start:start+16], k-1, axis=1)[:, :k]
+        else:
+            inds = np.broadcast_to(np.arange(distances.shape[1]), distances.shape)
+        top_dist = np.take_along_axis(distances, inds, axis=1)
+        order = np.argsort(top_dist, axis=1, kind='stable')
+        return np.take_along_axis(top_dist, order, axis=1), np.take_along_axis(inds, order, axis=1)
+
+    def _distance_tiles(self, 
+                        X:np.array,
+                        first_row:int=0):
+        """Generator over query-by-train distance tiles
+
+        Queries are processed in blocks of tile_size rows and training rows
+        in blocks of block_size rows, so peak memory is bounded by
+        tile_size * block_size distances and a memory-mapped training set
+        is streamed from disk block by block. Removed rows get an
+        infinite distance.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        first_row : int, default=0
+            First training row of the tiles.
+
+        Yields:
+            (int, int, ndarray): first query row and first training row of
+            the tile and its distances of shape (tile_size, block_size)
+        """
+        n_samples = self.__X_train.shape[0]
+        block_size = self.__block_size
+        if block_size is None:
+            # compact storage is converted to floats block by block, never as a whole
+            compact = self.__quantize is not None or self.__dtype != 'float64'
+            block_size = 65536 if isinstance(self.__X_train, np.memmap) or compact else n_samples
+        block_size = max(block_size, 1)
+        alive = self.__alive_rows()
+        for start in range(0, X.shape[0], self.__tile_size):
+            x = X[start:start+self.__tile_size]
+            for train_start in range(first_row, n_samples, block_size):
+                train_stop = train_start + block_size
+                sq_norms = None if self.__sq_norms is None else self.__sq_norms[train_start:train_stop]
+                distances = self._minkowski(x, self.__rows_as_float(self.__X_train[train_start:train_stop]), sq_norms)
+                if alive is not None:
+                    distances[:, ~alive[train_start:train_stop]] = np.inf
+                yield start, train_start, distances
+                # the caller released the tile, the next one can take its memory
+                del distances
+
+    def _minkowski(self, x, x_train, sq_norms=None):
         """Function to calculate minkowski distance
 
         Args:
             x : array-like of shape (n_queries, n_features)
-            x_train: array-like of shape (n_queries, n_features)
+            x_train: array-like of shape (n_samples, n_features)
+            sq_norms: precomputed squared norms of x_train rows or None
 
         Returns:
-            ndarray: predict distance
+            ndarray: distances of shape (n_queries, n_samples)
+        """
+        x = np.asarray(x, dtype=x_train.dtype)
+        if self.__p == 2:
+            # ||a||^2 + ||b||^2 - 2ab
+            if sq_norms is None:
+                sq_norms = np.einsum('ij,ij->i', x_train, x_train)
+            # accumulated in place, the product is the only tile-sized array
+            distances = x @ x_train.T
+            distances *= -2
+            distances += np.einsum('ij,ij->i', x, x)[:, None]
+            distances += sq_norms[None, :]
+            np.maximum(distances, 0, out=distances)
+            return np.sqrt(distances, out=distances)
+        # accumulate |a-b| feature by feature to avoid a 3-d intermediate,
+        # one reused buffer holds the differences of a feature
+        distances = np.zeros((x.shape[0], x_train.shape[0]), dtype=x_train.dtype)
+        diff = np.empty_like(distances)
+        for feature in range(x.shape[1]):
+            np.subtract(x[:, feature, None], x_train[None, :, feature], out=diff)
+            distances += np.abs(diff, out=diff)
+        return distances
+
+    def __fit_quantizer(self, 
+                        X:np.array):
+        """Function to fit the per-feature int8 scale and offset on X
+        """
+        low = np.min([block.min(axis=0) for block in self.__blocks(X)], axis=0)
+        high = np.max([block.max(axis=0) for block in self.__blocks(X)], axis=0)
+        self.__offset = ((high + low) / 2).astype(np.float32)
+        scale = (high - low) / 254
+        self.__scale = np.where(scale > 0, scale, 1).astype(np.float32)
+
+    def __compact(self, 
+                    X:np.array)->np.ndarray:
+        """Function to convert rows to the storage dtype of the reference matrix
         """
-        return np.sum(np.abs(x-x_train))**(1/self.__p)
+        if self.__quantize == 'int8':
+            codes = np.empty(X.shape, dtype=np.int8)
+            for start in range(0, X.shape[0], 65536):
+                block = (np.asarray(X[start:start+65536]) - self.__offset) / self.__scale
+                codes[start:start+65536] = np.clip(np.rint(block), -127, 127)
+            return codes
+        compact = X.astype(self.__dtype, copy=False)
+        # a converted memmap is held in memory, it must not pass for a view on the file
+        return compact if compact is X else np.asarray(compact)
+
+    def __rows_as_float(self, 
+                        rows:np.array)->np.ndarray:
+        """Function to get stored rows as floats, int8 codes are dequantized
+        """
+        if self.__quantize == 'int8':
+            return rows.astype(np.float32) * self.__scale + self.__offset
+        return np.asarray(rows)
+
+    def __alive_rows(self)->np.ndarray or None:
+        """Function to get the tombstone mask of stored rows, None if nothing was removed
+        """
+        return self.__alive[:self.__n_rows] if self.__n_dead else None
+
+    def __set_rows(self, 
+                    X:np.array, 
+                    y:np.array, 
+                    ids:np.array,
+                    X_full:np.array or None=None):
+        """Function to replace the stored rows, their buffers start full
+
+        X is already in the storage dtype, X_full keeps the full-precision
+        rows for re-ranking.
+        """
+        self.__X_buffer, self.__y_buffer, self.__ids_buffer = X, y, ids
+        self.__full_buffer = X_full
+        self.__alive_buffer = np.ones(len(X), dtype=bool)
+        self.__norms_buffer = None
+        if self.__p == 2:
+            self.__norms_buffer = np.concatenate([np.einsum('ij,ij->i', block, block) 
+                                                for block in map(self.__rows_as_float, self.__blocks(X))])
+        self.__n_rows, self.__n_dead = len(X), 0
+        self.__update_views()
+
+    def __update_views(self):
+        """Function to expose the filled part of the buffers
+        """
+        n_rows = self.__n_rows
+        self.__X_train = self.__X_buffer[:n_rows]
+        self.__y_train = self.__y_buffer[:n_rows]
+        self.__ids = self.__ids_buffer[:n_rows]
+        self.__alive = self.__alive_buffer[:n_rows]
+        self.__sq_norms = None if self.__norms_buffer is None else self.__norms_buffer[:n_rows]
+        self.__X_full = None if self.__full_buffer is None else self.__full_buffer[:n_rows]
+        if self.__index is not None:
+            self.__index._X = self.__X_train
+
+    def __new_buffer(self, 
+                    like:np.array, 
+                    capacity:int, 
+                    dtype=None)->np.ndarray:
+        """Function to allocate an empty buffer of capacity rows shaped like another one
+
+        The buffer of a memory-mapped matrix is a new .npy file next to the
+        file given to fit, so growing and compacting never load it into
+        memory. The model owns the file, it is deleted once the buffer is
+        replaced or the model is garbage collected.
+        """
+        shape, dtype = (capacity,) + like.shape[1:], dtype or like.dtype
+        if isinstance(like, np.memmap) and self.__source_file is not None:
+            stem = os.path.splitext(os.path.basename(self.__source_file))[0]
+            handle, path = tempfile.mkstemp(suffix='.npy', 
+                                            prefix=stem + '.buffer.', 
+                                            dir=os.path.dirname(self.__source_file))
+            os.close(handle)
+            self.__own_files[path] = weakref.finalize(self, _remove_file, path)
+            return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+        return np.empty(shape, dtype=dtype)
+
+    def __release(self, 
+                    buffer:np.array or None):
+        """Function to delete the file of a replaced buffer if the model created it
+
+        The file given to fit is never deleted.
+        """
+        path = getattr(buffer, 'filename', None)
+        if path is not None and os.path.abspath(path) in self.__own_files:
+            self.__own_files.pop(os.path.abspath(path))()
+
+    def __take_rows(self, 
+                    buffer:np.array, 
+                    rows:np.array, 
+                    capacity:int or None=None, 
+                    dtype=None)->np.ndarray:
+        """Function to copy the given rows into a new buffer block by block
+        """
+        new = self.__new_buffer(like=buffer, 
+                                capacity=capacity or len(rows), 
+                                dtype=dtype)
+        for start in range(0, len(rows), 65536):
+            block = rows[start:start+65536]
+            new[start:start+len(block)] = buffer[block]
+        return new
+
+    def __grow(self, 
+                n_new:int, 
+                y_dtype:np.dtype):
+        """Function to reserve room for n_new rows, doubling the buffers capacity
+        """
+        needed = self.__n_rows + n_new
+        capacity = len(self.__X_buffer)
+        if needed <= capacity and np.result_type(self.__y_buffer.dtype, y_dtype) == self.__y_buffer.dtype:
+            return
+        capacity = max(needed, 2 * capacity)
+        old_buffers = self.__X_buffer, self.__full_buffer
+        def regrow(buffer, dtype=None):
+            return self.__take_rows(buffer=buffer, 
+                                    rows=np.arange(self.__n_rows), 
+                                    capacity=capacity, 
+                                    dtype=dtype)
+        self.__X_buffer = regrow(self.__X_buffer)
+        self.__y_buffer = regrow(self.__y_buffer, np.result_type(self.__y_buffer.dtype, y_dtype))
+        self.__ids_buffer = regrow(self.__ids_buffer)
+        self.__alive_buffer = regrow(self.__alive_buffer)
+        if self.__norms_buffer is not None:
+            self.__norms_buffer = regrow(self.__norms_buffer)
+        if self.__full_buffer is not None:
+            self.__full_buffer = regrow(self.__full_buffer, np.float64)
+        for buffer in old_buffers:
+            self.__release(buffer=buffer)
+
+    def __build_index(self):
+        """Function to build the configured neighbor index over all stored rows
+        """
+        algorithm = self.__algorithm
+        if algorithm == 'auto':
+            # walking a tree query by query in Python only beats the tiled
+            # brute-force kernel in very low dimensions, past four features
+            # the boxes prune too little to pay for the interpreted loop
+            algorithm = 'kd_tree' if self.__X_train.shape[1] <= 4 else 'brute'
+        self.__index = None
+        self.__n_indexed = self.__n_rows
+        if self.__approximate:
+            self.__index = _IVFIndex(X=self.__X_train, 
+                                    p=self.__p, 
+                                    n_lists=self.__n_lists, 
+                                    n_probes=self.__n_probes, 
+                                    random_state=self.__random_state)
+        elif algorithm != 'brute':
+            tree = _KDTree if algorithm == 'kd_tree' else _BallTree
+            self.__index = tree(X=self.__X_train, 
+                                p=self.__p, 
+                                leaf_size=self.__leaf_size)
     
     def _fit(self, 
-            X:pd.DataFrame or np.array, 
-            y:pd.Series or np.array):
+            X:pd.DataFrame or np.array or str, 
+            y:pd.Series or np.array,
+            mmap_path:str or None=None):
         """Fit the k-nearest neighbors classifier from the training dataset.
 
         Parameters
         ----------
-        X : {array-like, sparse matrix} of shape (n_samples, n_features)
-            Training data.
+        X : {array-like, sparse matrix} of shape (n_samples, n_features) or str
+            Training data or path to a .npy file, which is memory-mapped.
 
         y : {array-like, sparse matrix} of shape (n_samples,)
             Target values.
 
+        mmap_path : str or None, default=None
+            If set, X is saved to this .npy file and memory-mapped from it.
+
         Returns
         -------
         self : KNeighborsClassifier
             The fitted k-nearest neighbors classifier.
         """
+        X = _load_array(X)
         if isinstance(X, np.ndarray)==False:
             self.n_features = X.shape[1]
             self.feature_names_ = np.array(X.columns)
@@ -91,7 +685,119 @@ class _KNNTools():
             'Argument y must be only pandas Series and has some X len'
         else:
             raise Exception('Argument y must be only pandas Series and has some X len')
-        return X, y
+        if mmap_path is not None:
+            np.save(mmap_path, np.asarray(X, dtype=np.float64))
+            X = np.load(mmap_path, mmap_mode='r')
+        # a float64 memmap stays a view on the file, nothing is copied
+        X = X if isinstance(X, np.memmap) and X.dtype == np.float64 \
+            else np.asarray(X, dtype=np.float64)
+        # buffer files of an earlier fit are not needed anymore
+        for finalizer in list(self.__own_files.values()):
+            finalizer()
+        self.__own_files = {}
+        self.__source_file = os.path.abspath(X.filename) if isinstance(X, np.memmap) and X.filename else None
+        self.__index = None
+        if self.__quantize == 'int8':
+            self.__fit_quantizer(X=X)
+        # with rerank the full-precision rows are kept as given, a memmap stays on disk
+        self.__set_rows(X=self.__compact(X), 
+                        y=np.asarray(y), 
+                        ids=np.arange(len(X)),
+                        X_full=X if self.__rerank else None)
+        self.__next_id = len(X)
+        self.__build_index()
+        if self.__approximate:
+            # recall of the approximate search, measured on training rows
+            rows = np.random.default_rng(self.__random_state).choice(self.__X_train.shape[0], 
+                                                                    size=min(self.__X_train.shape[0], 200), 
+                                                                    replace=False)
+            self.recall_ = self._estimate_recall(X=self.__X_train[rows], 
+                                                rows=rows)
+        return self.__X_train, self.__y_train
+
+    def _partial_fit(self, 
+                    X:pd.DataFrame or np.array, 
+                    y:pd.Series or np.array):
+        """Append samples to the fitted reference set without a full rebuild.
+
+        The buffers grow by doubling, so appending is amortized O(1) per
+        row. A memory-mapped reference matrix grows into a new .npy file
+        next to the mapped one instead of memory. The approximate index
+        assigns new rows to their cells right away, tree indexes search new
+        rows by brute force until they outnumber the indexed ones and the
+        tree is rebuilt.
+
+        Parameters
+        ----------
+        X : {array-like, sparse matrix} of shape (n_samples, n_features)
+            New training data.
+
+        y : {array-like, sparse matrix} of shape (n_samples,)
+            New target values.
+        """
+        if self.__X_train is None:
+            return self._fit(X=X, 
+                            y=y)
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y)
+        assert \
+        (X.ndim == 2) and (X.shape[1] == self.__X_train.shape[1]) and (len(y) == len(X)), \
+        'Argument X must have the fitted number of features and y the same len as X'
+        self.__grow(n_new=len(X), 
+                    y_dtype=y.dtype)
+        start, stop = self.__n_rows, self.__n_rows + len(X)
+        self.__X_buffer[start:stop] = self.__compact(X)
+        self.__y_buffer[start:stop] = y
+        self.__ids_buffer[start:stop] = np.arange(self.__next_id, self.__next_id + len(X))
+        self.__alive_buffer[start:stop] = True
+        if self.__norms_buffer is not None:
+            rows = self.__rows_as_float(self.__X_buffer[start:stop])
+            self.__norms_buffer[start:stop] = np.einsum('ij,ij->i', rows, rows)
+        if self.__full_buffer is not None:
+            self.__full_buffer[start:stop] = X
+        self.__n_rows, self.__next_id = stop, self.__next_id + len(X)
+        self.__update_views()
+        if isinstance(self.__index, _IVFIndex):
+            self.__index.add(first_row=self.__n_indexed)
+            self.__n_indexed = self.__n_rows
+        elif self.__index is not None and self.__n_rows - self.__n_indexed > self.__n_indexed:
+            self.__build_index()
+        return self.__X_train, self.__y_train
+
+    def _remove(self, 
+                ids:np.array):
+        """Remove samples by id with tombstones.
+
+        Removed rows are skipped by every search. Once more than half of
+        the stored rows are removed they are compacted away and the index
+        is rebuilt, a memory-mapped reference matrix into a new .npy file.
+
+        Parameters
+        ----------
+        ids : array-like of shape (n_removed,)
+            Ids of the samples, as returned by kneighbors.
+        """
+        ids = np.atleast_1d(np.asarray(ids))
+        rows = np.searchsorted(self.__ids, ids)
+        assert \
+        np.all(rows < self.__n_rows) and np.array_equal(self.__ids[np.minimum(rows, self.__n_rows - 1)], ids), \
+        'Argument ids must be only ids of stored samples'
+        rows = np.unique(rows[self.__alive[rows]])
+        assert \
+        self.__n_rows - self.__n_dead - len(rows) > 0, \
+        'Argument ids must leave at least one sample'
+        self.__alive[rows] = False
+        self.__n_dead += len(rows)
+        if self.__n_dead > self.__n_rows // 2:
+            keep = np.flatnonzero(self.__alive)
+            old_buffers = self.__X_buffer, self.__full_buffer
+            self.__set_rows(X=self.__take_rows(buffer=self.__X_train, rows=keep), 
+                            y=self.__y_train[keep], 
+                            ids=self.__ids[keep],
+                            X_full=None if self.__X_full is None else self.__take_rows(buffer=self.__X_full, rows=keep))
+            for buffer in old_buffers:
+                self.__release(buffer=buffer)
+            self.__build_index()
 
     def _check_params(self):
         """Check input parameters
@@ -109,6 +815,87 @@ class _KNNTools():
             'Argument p must be only integer in the range [1, 2]'
         else:
             raise Exception('Argument p must be only integer')
+
+        if isinstance(self.__tile_size, int):
+            assert \
+            self.__tile_size > 0, \
+            'Argument tile_size must be only integer in the range [1, inf)'
+        else:
+            raise Exception('Argument tile_size must be only integer')
+
+        if isinstance(self.__algorithm, str):
+            assert \
+            self.__algorithm in ['auto', 'brute', 'kd_tree', 'ball_tree'], \
+            'Argument algorithm must be only auto, brute, kd_tree or ball_tree'
+        else:
+            raise Exception('Argument algorithm must be only string')
+
+        if isinstance(self.__leaf_size, int):
+            assert \
+            self.__leaf_size > 0, \
+            'Argument leaf_size must be only integer in the range [1, inf)'
+        else:
+            raise Exception('Argument leaf_size must be only integer')
+
+        if isinstance(self.__approximate, bool)==False:
+            raise Exception('Argument approximate must be only boolean')
+
+        if self.__n_lists is not None:
+            if isinstance(self.__n_lists, int):
+                assert \
+                self.__n_lists > 0, \
+                'Argument n_lists must be only integer or None in the range [1, inf)'
+            else:
+                raise Exception('Argument n_lists must be only integer or None')
+
+        if isinstance(self.__n_probes, int):
+            assert \
+            self.__n_probes > 0, \
+            'Argument n_probes must be only integer in the range [1, inf)'
+        else:
+            raise Exception('Argument n_probes must be only integer')
+
+        if self.__n_jobs is not None:
+            if isinstance(self.__n_jobs, int):
+                assert \
+                self.__n_jobs != 0, \
+                'Argument n_jobs must be only integer or None and not 0'
+            else:
+                raise Exception('Argument n_jobs must be only integer or None')
+
+        if self.__block_size is not None:
+            if isinstance(self.__block_size, int):
+                assert \
+                self.__block_size > 0, \
+                'Argument block_size must be only integer or None in the range [1, inf)'
+            else:
+                raise Exception('Argument block_size must be only integer or None')
+
+        if isinstance(self.__dtype, str):
+            assert \
+            self.__dtype in ['float64', 'float32'], \
+            'Argument dtype must be only float64 or float32'
+        else:
+            raise Exception('Argument dtype must be only string')
+
+        if self.__quantize is not None:
+            assert \
+            self.__quantize == 'int8', \
+            'Argument quantize must be only int8 or None'
+            assert \
+            (self.__algorithm == 'brute') & (self.__approximate == False), \
+            'Argument quantize is supported only with algorithm brute'
+
+        if self.__rerank is not None:
+            if isinstance(self.__rerank, int):
+                assert \
+                self.__rerank > 0, \
+                'Argument rerank must be only integer or None in the range [1, inf)'
+                assert \
+                (self.__algorithm == 'brute') & (self.__approximate == False), \
+                'Argument rerank is supported only with algorithm brute'
+            else:
+                raise Exception('Argument rerank must be only integer or None')
         
 class KNNClassifier(_KNNTools): 
     """Classifier implementing the k-nearest neighbors vote.
@@ -121,38 +908,185 @@ class KNNClassifier(_KNNTools):
         Power parameter for the Minkowski metric. When p = 1, this is
         equivalent to using manhattan_distance (l1), and euclidean_distance
         (l2) for p = 2.
+
+    tile_size : int, default=256
+        Number of test samples whose distances to the training set are
+        computed in one vectorized block. Peak memory of predict is about
+        tile_size * n_samples * 8 bytes (n_samples is block_size if set),
+        twice that for p = 1.
+
+    algorithm : {'auto', 'brute', 'kd_tree', 'ball_tree'}, default='brute'
+        Algorithm used to compute the nearest neighbors. 'kd_tree' and
+        'ball_tree' build a spatial index once in :meth:`fit`, 'auto'
+        picks the KD-tree for up to 4 features and brute force otherwise.
+        The trees are walked query by query in Python, the ball tree is
+        usually slower than brute force and is never picked by 'auto'.
+
+    leaf_size : int, default=30
+        Leaf size of the KD-tree or ball tree. Affects the speed of the
+        index construction and query.
+
+    approximate : bool, default=False
+        If True, :meth:`fit` builds an inverted-file index (k-means cells)
+        and neighbors are searched only in the closest cells. Overrides
+        algorithm. The estimated recall against the exact search is
+        stored in recall_.
+
+    n_lists : int or None, default=None
+        Number of cells of the approximate index. None means sqrt(n_samples).
+
+    n_probes : int, default=8
+        Number of cells scanned per query in approximate mode. More probes
+        give higher recall and slower queries.
+
+    random_state : int or None, default=None
+        Seed of the approximate index construction.
+
+    n_jobs : int or None, default=None
+        Number of threads that search tiles of test samples in parallel.
+        None means 1, -1 means all processors.
+
+    block_size : int or None, default=None
+        Number of training samples per distance block of the brute-force
+        search. None means all samples for in-memory float64 data and 65536
+        for memory-mapped data, which is then streamed from disk, or for
+        float32 and int8 storage, which is dequantized block by block.
+
+    dtype : {'float64', 'float32'}, default='float64'
+        Storage and compute dtype of the reference matrix. float32 halves
+        its memory.
+
+    quantize : {'int8'} or None, default=None
+        If 'int8', the reference matrix is stored as int8 codes with a
+        per-feature scale and offset (8x smaller than float64) and
+        distances are computed on the dequantized blocks. Brute force only.
+
+    rerank : int or None, default=None
+        If set, rerank * n_neighbors candidates of the compact search are
+        re-ranked with full-precision distances. The full-precision rows
+        are kept as given to fit (a memory-mapped file stays on disk).
+        Brute force only.
+
+    weights : {'uniform', 'distance'}, default='uniform'
+        Weight of a neighbor in the vote. 'distance' weights neighbors by
+        the inverse of their distance; exact matches outvote all others.
     """
     def __init__(self, 
                 n_neighbors:int,
-                p:int=2):
+                p:int=2,
+                tile_size:int=256,
+                algorithm:str='brute',
+                leaf_size:int=30,
+                approximate:bool=False,
+                n_lists:int or None=None,
+                n_probes:int=8,
+                random_state:int or None=None,
+                n_jobs:int or None=None,
+                block_size:int or None=None,
+                dtype:str='float64',
+                quantize:str or None=None,
+                rerank:int or None=None,
+                weights:str='uniform'):
                 
         self.n_neighbors = n_neighbors
         self.__p = p
+        self.__weights = weights
+        if isinstance(self.__weights, str):
+            assert \
+            self.__weights in ['uniform', 'distance'], \
+            'Argument weights must be only uniform or distance'
+        else:
+            raise Exception('Argument weights must be only string')
         super().__init__(n_neighbors=self.n_neighbors,
-                        p=self.__p)
+                        p=self.__p,
+                        tile_size=tile_size,
+                        algorithm=algorithm,
+                        leaf_size=leaf_size,
+                        approximate=approximate,
+                        n_lists=n_lists,
+                        n_probes=n_probes,
+                        random_state=random_state,
+                        n_jobs=n_jobs,
+                        block_size=block_size,
+                        dtype=dtype,
+                        quantize=quantize,
+                        rerank=rerank)
         super()._check_params()
         
     @_df_np_check
     def fit(self, 
-            X:pd.DataFrame or np.array, 
-            y:pd.Series or np.array):
+            X:pd.DataFrame or np.array or str, 
+            y:pd.Series or np.array,
+            mmap_path:str or None=None):
         """Fit the k-nearest neighbors classifier from the training dataset.
 
         Parameters
         ----------
-        X : {array-like, sparse matrix} of shape (n_samples, n_features)
-            Training data.
+        X : {array-like, sparse matrix} of shape (n_samples, n_features) or str
+            Training data or path to a .npy file. A .npy file is memory-mapped
+            read-only, so worker processes fitted on the same file share
+            its pages.
 
         y : {array-like, sparse matrix} of shape (n_samples,)
             Target values.
 
+        mmap_path : str or None, default=None
+            If set, X is saved to this .npy file and the model keeps a
+            read-only memory map of it instead of an in-memory copy.
+
         Returns
         -------
         self : KNeighborsClassifier
             The fitted k-nearest neighbors classifier.
         """
-        self.__X_train, self.__y_train = super()._fit(X=X, 
-                                                        y=y)
+        super()._fit(X=X, 
+                    y=y,
+                    mmap_path=mmap_path)
+        self.classes_ = np.unique(np.asarray(y))
+        return self
+
+    def partial_fit(self, 
+                    X:pd.DataFrame or np.array, 
+                    y:pd.Series or np.array):
+        """Append samples to the reference set without refitting.
+
+        Parameters
+        ----------
+        X : {array-like, sparse matrix} of shape (n_samples, n_features)
+            New training data.
+
+        y : {array-like, sparse matrix} of shape (n_samples,)
+            New target values.
+
+        Returns
+        -------
+        self : KNNClassifier
+            The updated model.
+        """
+        super()._partial_fit(X=X, 
+                            y=y)
+        # an unfitted model takes the classes of y, so labels keep the dtype of y
+        self.classes_ = np.union1d(self.classes_, np.asarray(y)) if hasattr(self, 'classes_') else np.unique(np.asarray(y))
+        return self
+
+    def remove(self, 
+                ids:np.array or list or int):
+        """Remove samples from the reference set.
+
+        Removed samples are tombstoned and compacted away once they make
+        up more than half of the stored rows.
+
+        Parameters
+        ----------
+        ids : array-like of shape (n_removed,) or int
+            Ids of the samples, as returned by kneighbors.
+
+        Returns
+        -------
+        self : KNNClassifier
+            The updated model.
+        """
+        super()._remove(ids=ids)
         return self
 
     @_df_np_check
@@ -170,22 +1104,156 @@ class KNNClassifier(_KNNTools):
         y : ndarray of shape (n_queries,) or (n_queries, n_outputs)
             Class labels for each data sample.
         """
+        X = _load_array(X)
         if isinstance(X, np.ndarray)==False:
             X = np.array(X)
-        self.__X_test = X
-        super().__init__(X_train = self.__X_train,
-                        y_train = self.__y_train,
-                        n_neighbors=self.n_neighbors,
-                        p=self.__p)
-        # initialize Y_predict
-        pred = np.zeros(self.__X_test.shape[0])
-        for ind, query in enumerate(self.__X_test):
-            # find the K nearest neighbors from current test example
-            neighbors = np.zeros(self.n_neighbors)
-            neighbors = super()._find_neighbors(query)
-            # most frequent class in K neighbors
-            pred[ind] = mode(neighbors, keepdims = True)[0][0]    
-        return pred.flatten()
+        # most voted class in K neighbors, ties go to the smallest class
+        votes = self.__vote(X=X)
+        return self.classes_[votes.argmax(axis=1)]
+
+    @_df_np_check
+    def predict_proba(self, X):
+        """Return probability estimates for the test data X.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        Returns
+        -------
+        p : ndarray of shape (n_queries, n_classes)
+            Vote fractions of the classes, ordered as in classes_.
+        """
+        X = _load_array(X)
+        if isinstance(X, np.ndarray)==False:
+            X = np.array(X)
+        votes = self.__vote(X=X)
+        return votes / votes.sum(axis=1, keepdims=True)
+
+    def __vote(self, 
+                X:np.array)->np.ndarray:
+        '''Function to count the (weighted) votes of the K neighbors for every class
+        '''
+        # find the K nearest neighbors of all test examples at once
+        dist, neighbors = super()._find_neighbors(X, 
+                                                return_distance=True)
+        n_queries, n_classes = neighbors.shape[0], len(self.classes_)
+        codes = np.searchsorted(self.classes_, neighbors)
+        if self.__weights == 'distance':
+            with np.errstate(divide='ignore'):
+                weights = 1 / dist
+            # exact matches take the whole vote of their query
+            exact = np.isinf(weights)
+            exact_rows = exact.any(axis=1)
+            weights[exact_rows] = exact[exact_rows]
+        else:
+            weights = np.ones(neighbors.shape)
+        # one bincount over (query, class) pairs for the whole batch
+        flat = (codes + n_classes * np.arange(n_queries)[:, None]).ravel()
+        votes = np.bincount(flat, weights=weights.ravel(), minlength=n_queries * n_classes)
+        return votes.reshape(n_queries, n_classes)
+
+    @_df_np_check
+    def estimate_recall(self, X):
+        """Estimate recall of the neighbor search against exact brute force.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        Returns
+        -------
+        recall : float
+            Mean fraction of the exact k nearest neighbors that the
+            configured search returns. Always 1.0 unless approximate=True.
+        """
+        X = _load_array(X)
+        if isinstance(X, np.ndarray)==False:
+            X = np.array(X)
+        return super()._estimate_recall(X=X)
+
+    @_df_np_check
+    def kneighbors(self, 
+                    X, 
+                    n_neighbors:int or None=None, 
+                    return_distance:bool=True):
+        """Find the K-neighbors of a point.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        n_neighbors : int or None, default=None
+            Number of neighbors. None means the n_neighbors of the model.
+
+        return_distance : bool, default=True
+            Whether or not to return the distances.
+
+        Returns
+        -------
+        neigh_dist : ndarray of shape (n_queries, n_neighbors)
+            Distances to the neighbors, only present if return_distance=True.
+
+        neigh_ind : ndarray of shape (n_queries, n_neighbors)
+            Ids of the nearest training samples, sorted by distance. Ids are
+            positions in the order samples were added by fit and partial_fit.
+        """
+        assert \
+        (n_neighbors is None) or (isinstance(n_neighbors, int) and n_neighbors > 0), \
+        'Argument n_neighbors must be only integer in the range [1, inf) or None'
+        X = _load_array(X)
+        if isinstance(X, np.ndarray)==False:
+            X = np.array(X)
+        neigh_dist, neigh_ind = super()._kneighbors(X=X, 
+                                                    n_neighbors=n_neighbors)
+        neigh_ind = super()._row_ids(neigh_ind)
+        return (neigh_dist, neigh_ind) if return_distance else neigh_ind
+
+    @_df_np_check
+    def radius_neighbors(self, 
+                        X, 
+                        radius:float, 
+                        return_distance:bool=True):
+        """Find the neighbors within a given radius of a point.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        radius : float
+            Maximum distance of a neighbor.
+
+        return_distance : bool, default=True
+            Whether or not to return the distances.
+
+        Returns
+        -------
+        indptr : ndarray of shape (n_queries + 1,)
+            Neighbors of query i are stored at indptr[i]:indptr[i+1].
+
+        neigh_ind : ndarray of shape (n_neighbors_total,)
+            Ids of the training samples, sorted by distance per query.
+
+        neigh_dist : ndarray of shape (n_neighbors_total,)
+            Distances to the neighbors, only present if return_distance=True.
+        """
+        if (isinstance(radius, int)) | (isinstance(radius, float)):
+            assert \
+            radius >= 0, \
+            'Argument radius must be only integer or float in the range [0, inf)'
+        else:
+            raise Exception('Argument radius must be only integer or float')
+        X = _load_array(X)
+        if isinstance(X, np.ndarray)==False:
+            X = np.array(X)
+        indptr, neigh_ind, neigh_dist = super()._radius_neighbors(X=X, 
+                                                                radius=radius)
+        neigh_ind = super()._row_ids(neigh_ind)
+        return (indptr, neigh_ind, neigh_dist) if return_distance else (indptr, neigh_ind)
     
 class KNNRegressor(_KNNTools): 
     """Regression based on k-nearest neighbors.
@@ -201,38 +1269,170 @@ class KNNRegressor(_KNNTools):
         p : int, default=2
             Power parameter for the Minkowski metric. When p = 1, this is
             equivalent to using manhattan_distance (l1), and euclidean_distance
-            (l2) for p = 2. Default = 2"""
+            (l2) for p = 2. Default = 2
+
+        tile_size : int, default=256
+            Number of test samples whose distances to the training set are
+            computed in one vectorized block. Peak memory of predict is about
+            tile_size * n_samples * 8 bytes (n_samples is block_size if set),
+            twice that for p = 1.
+
+        algorithm : {'auto', 'brute', 'kd_tree', 'ball_tree'}, default='brute'
+            Algorithm used to compute the nearest neighbors. 'kd_tree' and
+            'ball_tree' build a spatial index once in :meth:`fit`, 'auto'
+            picks the KD-tree for up to 4 features and brute force otherwise.
+            The trees are walked query by query in Python, the ball tree is
+            usually slower than brute force and is never picked by 'auto'.
+
+        leaf_size : int, default=30
+            Leaf size of the KD-tree or ball tree. Affects the speed of the
+            index construction and query.
+
+        approximate : bool, default=False
+            If True, :meth:`fit` builds an inverted-file index (k-means cells)
+            and neighbors are searched only in the closest cells. Overrides
+            algorithm. The estimated recall against the exact search is
+            stored in recall_.
+
+        n_lists : int or None, default=None
+            Number of cells of the approximate index. None means sqrt(n_samples).
+
+        n_probes : int, default=8
+            Number of cells scanned per query in approximate mode. More probes
+            give higher recall and slower queries.
+
+        random_state : int or None, default=None
+            Seed of the approximate index construction.
+
+        n_jobs : int or None, default=None
+            Number of threads that search tiles of test samples in parallel.
+            None means 1, -1 means all processors.
+
+        block_size : int or None, default=None
+            Number of training samples per distance block of the brute-force
+            search. None means all samples for in-memory float64 data and 65536
+            for memory-mapped data, which is then streamed from disk, or for
+            float32 and int8 storage, which is dequantized block by block.
+
+        dtype : {'float64', 'float32'}, default='float64'
+            Storage and compute dtype of the reference matrix. float32 halves
+            its memory.
+
+        quantize : {'int8'} or None, default=None
+            If 'int8', the reference matrix is stored as int8 codes with a
+            per-feature scale and offset (8x smaller than float64) and
+            distances are computed on the dequantized blocks. Brute force only.
+
+        rerank : int or None, default=None
+            If set, rerank * n_neighbors candidates of the compact search are
+            re-ranked with full-precision distances. The full-precision rows
+            are kept as given to fit (a memory-mapped file stays on disk).
+            Brute force only."""
     
     def __init__(self, 
                 n_neighbors:int,
-                p:int=2):
+                p:int=2,
+                tile_size:int=256,
+                algorithm:str='brute',
+                leaf_size:int=30,
+                approximate:bool=False,
+                n_lists:int or None=None,
+                n_probes:int=8,
+                random_state:int or None=None,
+                n_jobs:int or None=None,
+                block_size:int or None=None,
+                dtype:str='float64',
+                quantize:str or None=None,
+                rerank:int or None=None):
         self.n_neighbors = n_neighbors
         self.__p = p
         super().__init__(n_neighbors=self.n_neighbors,
-                        p=self.__p)
+                        p=self.__p,
+                        tile_size=tile_size,
+                        algorithm=algorithm,
+                        leaf_size=leaf_size,
+                        approximate=approximate,
+                        n_lists=n_lists,
+                        n_probes=n_probes,
+                        random_state=random_state,
+                        n_jobs=n_jobs,
+                        block_size=block_size,
+                        dtype=dtype,
+                        quantize=quantize,
+                        rerank=rerank)
         super()._check_params()
     
     @_df_np_check
     def fit(self, 
-            X:pd.DataFrame or np.array, 
-            y:pd.Series or np.array):
+            X:pd.DataFrame or np.array or str, 
+            y:pd.Series or np.array,
+            mmap_path:str or None=None):
         """Fit the k-nearest neighbors regression from the training dataset.
 
         Parameters
         ----------
-        X : {array-like, sparse matrix} of shape (n_samples, n_features)
-            Training data.
+        X : {array-like, sparse matrix} of shape (n_samples, n_features) or str
+            Training data or path to a .npy file. A .npy file is memory-mapped
+            read-only, so worker processes fitted on the same file share
+            its pages.
 
         y : {array-like, sparse matrix} of shape (n_samples,)
             Target values.
 
+        mmap_path : str or None, default=None
+            If set, X is saved to this .npy file and the model keeps a
+            read-only memory map of it instead of an in-memory copy.
+
         Returns
         -------
         self : KNeighborsClassifier
             The fitted k-nearest neighbors regression.
         """
-        self.__X_train, self.__y_train = super()._fit(X=X, 
-                                                        y=y)
+        super()._fit(X=X, 
+                    y=y,
+                    mmap_path=mmap_path)
+        return self
+
+    def partial_fit(self, 
+                    X:pd.DataFrame or np.array, 
+                    y:pd.Series or np.array):
+        """Append samples to the reference set without refitting.
+
+        Parameters
+        ----------
+        X : {array-like, sparse matrix} of shape (n_samples, n_features)
+            New training data.
+
+        y : {array-like, sparse matrix} of shape (n_samples,)
+            New target values.
+
+        Returns
+        -------
+        self : KNNRegressor
+            The updated model.
+        """
+        super()._partial_fit(X=X, 
+                            y=y)
+        return self
+
+    def remove(self, 
+                ids:np.array or list or int):
+        """Remove samples from the reference set.
+
+        Removed samples are tombstoned and compacted away once they make
+        up more than half of the stored rows.
+
+        Parameters
+        ----------
+        ids : array-like of shape (n_removed,) or int
+            Ids of the samples, as returned by kneighbors.
+
+        Returns
+        -------
+        self : KNNRegressor
+            The updated model.
+        """
+        super()._remove(ids=ids)
         return self
 
     @_df_np_check
@@ -249,19 +1449,112 @@ class KNNRegressor(_KNNTools):
         y : ndarray of shape (n_queries,)
             Target values.
         """
+        X = _load_array(X)
+        if isinstance(X, np.ndarray)==False:
+            X = np.array(X)
+        # find the K nearest neighbors of all test examples at once
+        neighbors = super()._find_neighbors(X)
+        # mean target of K neighbors
+        pred = np.mean(neighbors, axis=1)
+        return pred.flatten()
+
+    @_df_np_check
+    def estimate_recall(self, X):
+        """Estimate recall of the neighbor search against exact brute force.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        Returns
+        -------
+        recall : float
+            Mean fraction of the exact k nearest neighbors that the
+            configured search returns. Always 1.0 unless approximate=True.
+        """
+        X = _load_array(X)
+        if isinstance(X, np.ndarray)==False:
+            X = np.array(X)
+        return super()._estimate_recall(X=X)
+
+    @_df_np_check
+    def kneighbors(self, 
+                    X, 
+                    n_neighbors:int or None=None, 
+                    return_distance:bool=True):
+        """Find the K-neighbors of a point.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        n_neighbors : int or None, default=None
+            Number of neighbors. None means the n_neighbors of the model.
+
+        return_distance : bool, default=True
+            Whether or not to return the distances.
+
+        Returns
+        -------
+        neigh_dist : ndarray of shape (n_queries, n_neighbors)
+            Distances to the neighbors, only present if return_distance=True.
+
+        neigh_ind : ndarray of shape (n_queries, n_neighbors)
+            Ids of the nearest training samples, sorted by distance. Ids are
+            positions in the order samples were added by fit and partial_fit.
+        """
+        assert \
+        (n_neighbors is None) or (isinstance(n_neighbors, int) and n_neighbors > 0), \
+        'Argument n_neighbors must be only integer in the range [1, inf) or None'
+        X = _load_array(X)
+        if isinstance(X, np.ndarray)==False:
+            X = np.array(X)
+        neigh_dist, neigh_ind = super()._kneighbors(X=X, 
+                                                    n_neighbors=n_neighbors)
+        neigh_ind = super()._row_ids(neigh_ind)
+        return (neigh_dist, neigh_ind) if return_distance else neigh_ind
+
+    @_df_np_check
+    def radius_neighbors(self, 
+                        X, 
+                        radius:float, 
+                        return_distance:bool=True):
+        """Find the neighbors within a given radius of a point.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_queries, n_features)
+            Test samples.
+
+        radius : float
+            Maximum distance of a neighbor.
+
+        return_distance : bool, default=True
+            Whether or not to return the distances.
+
+        Returns
+        -------
+        indptr : ndarray of shape (n_queries + 1,)
+            Neighbors of query i are stored at indptr[i]:indptr[i+1].
+
+        neigh_ind : ndarray of shape (n_neighbors_total,)
+            Ids of the training samples, sorted by distance per query.
+
+        neigh_dist : ndarray of shape (n_neighbors_total,)
+            Distances to the neighbors, only present if return_distance=True.
+        """
+        if (isinstance(radius, int)) | (isinstance(radius, float)):
+            assert \
+            radius >= 0, \
+            'Argument radius must be only integer or float in the range [0, inf)'
+        else:
+            raise Exception('Argument radius must be only integer or float')
+        X = _load_array(X)
         if isinstance(X, np.ndarray)==False:
             X = np.array(X)
-        self.__X_test = X
-        super().__init__(X_train = self.__X_train,
-                        y_train = self.__y_train,
-                        n_neighbors=self.n_neighbors,
-                        p=self.__p)
-        # initialize Y_predict
-        pred = np.zeros(self.__X_test.shape[0])
-        for ind, query in enumerate(self.__X_test):
-            # find the K nearest neighbors from current test example
-            neighbors = np.zeros(self.n_neighbors)
-            neighbors = super()._find_neighbors(query)
-            # most frequent class in K neighbors
-            pred[ind] = np.mean(neighbors) 
-        return pred.flatten()
\ No newline at end of file
+        indptr, neigh_ind, neigh_dist = super()._radius_neighbors(X=X, 
+                                                                radius=radius)
+        neigh_ind = super()._row_ids(neigh_ind)
+        return (indptr, neigh_ind, neigh_dist) if return_distance else (indptr, neigh_ind)
\ No newline at end of file
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.neighbors import NearestNeighbors
+from KNN import KNNClassifier
+
+# Create dataset
+seed = 42
+X, y = make_classification(n_samples=6000, n_features=8, n_informative=5, random_state=seed)
+X_train, y_train, X_new, y_new, X_test = X[:4000], y[:4000], X[4000:5000], y[4000:5000], X[5000:]
+
+def same_neighbors(model, X_ref, ids, k=5):
+    """Share of queries whose neighbor ids and distances equal sklearn on the given reference rows
+    """
+    dist, ind = model.kneighbors(X=X_test, n_neighbors=k)
+    sk_dist, sk_ind = NearestNeighbors(n_neighbors=k).fit(X_ref).kneighbors(X_test)
+    return np.mean(np.all(ind == ids[sk_ind], axis=1) & np.all(np.isclose(dist, sk_dist), axis=1))
+
+print("KNN SEARCH CHECK")
+
+#Exact search, appended and removed samples
+for algorithm in ['brute', 'kd_tree', 'ball_tree']:
+    model = KNNClassifier(n_neighbors=5, algorithm=algorithm).fit(X=X_train, y=y_train)
+    model.partial_fit(X=X_new, y=y_new)
+    removed = np.arange(0, 5000, 3)
+    model.remove(ids=removed)
+    keep = np.setdiff1d(np.arange(5000), removed)
+    print(algorithm, 'partial_fit + remove same as sklearn', same_neighbors(model, X[keep], keep))
+
+#Radius search
+model = KNNClassifier(n_neighbors=5, algorithm='kd_tree').fit(X=X_train, y=y_train)
+indptr, ind, dist = model.radius_neighbors(X=X_test, radius=2.5)
+sk_dist, sk_ind = NearestNeighbors(radius=2.5).fit(X_train).radius_neighbors(X_test, sort_results=True)
+print('radius same as sklearn', all(np.array_equal(np.sort(ind[indptr[i]:indptr[i+1]]), np.sort(sk_ind[i]))
+                                    for i in range(len(X_test))))
+
+#Approximate search after removing a whole cell
+model = KNNClassifier(n_neighbors=5, approximate=True, n_probes=1, random_state=seed).fit(X=X_train, y=y_train)
+cell = model._KNNTools__index.assign
+removed = np.flatnonzero(cell == np.bincount(cell).argmax())
+model.remove(ids=removed)
+dist, ind = model.kneighbors(X=X_test)
+print('ivf recall', model.recall_, 'removed ids returned', np.isin(ind, removed).sum(), 'inf distances', np.isinf(dist).sum())
+
+#Memory-mapped reference set, grown and compacted on disk
+with tempfile.TemporaryDirectory() as folder:
+    path = os.path.join(folder, 'X_train.npy')
+    model = KNNClassifier(n_neighbors=5).fit(X=X_train, y=y_train, mmap_path=path)
+    for start in range(0, len(X_new), 100):
+        model.partial_fit(X=X_new[start:start+100], y=y_new[start:start+100])
+    print('memmap after partial_fit', type(model._KNNTools__X_train).__name__, 'files', len(os.listdir(folder)))
+    removed = np.arange(0, 5000, 2)[:2600]
+    model.remove(ids=removed)
+    keep = np.setdiff1d(np.arange(5000), removed)
+    print('memmap after compaction', type(model._KNNTools__X_train).__name__,
+            'same as sklearn', same_neighbors(model, X[keep], keep), 'files', len(os.listdir(folder)))
+    del model
+    print('files after the model is gone', os.listdir(folder))
+
+#Compact storage
+for params in [dict(dtype='float32'), dict(quantize='int8'), dict(quantize='int8', rerank=4)]:
+    model = KNNClassifier(n_neighbors=5, **params).fit(X=X_train, y=y_train)
+    _, ind = model.kneighbors(X=X_test)
+    _, sk_ind = NearestNeighbors(n_neighbors=5).fit(X_train).kneighbors(X_test)
+    recall = np.mean([len(np.intersect1d(a, b)) / 5 for a, b in zip(ind, sk_ind)])
+    print(params, 'recall vs sklearn', recall)
@@ -0,0 +1,207 @@
+import numpy as np
+
+class _BinaryTree():
+    """Array-backed binary space partitioning tree for exact neighbor search.
+
+    Nodes are stored in heap order: node i has children 2i+1 and 2i+2 and
+    owns the training rows idx_array[node_start[i]:node_end[i]]. Every
+    internal node splits its rows at the median of the feature with the
+    largest spread, so the tree is balanced and leaves hold between
+    leaf_size and 2 * leaf_size training rows.
+
+    Parameters
+    ----------
+    X : ndarray of shape (n_samples, n_features)
+        Training data. The tree keeps a reference, not a copy.
+
+    p : int
+        Power parameter for the Minkowski metric (1 or 2).
+
+    leaf_size : int
+        Minimum number of training rows in a leaf.
+    """
+    def __init__(self,
+                X:np.array,
+                p:int,
+                leaf_size:int):
+        self._X = X
+        self._p = p
+        n_samples = X.shape[0]
+        self.n_levels = 1 + int(np.floor(np.log2(max(1, (n_samples - 1) / leaf_size))))
+        self.n_nodes = 2 ** self.n_levels - 1
+        self.idx_array = np.arange(n_samples)
+        self.node_start = np.zeros(self.n_nodes, dtype=np.intp)
+        self.node_end = np.zeros(self.n_nodes, dtype=np.intp)
+        self._allocate_bounds()
+        self.__build()
+
+    def __build(self):
+        '''Function to split every node at the median of its widest feature
+        '''
+        self.node_end[0] = self._X.shape[0]
+        for node in range(self.n_nodes):
+            start, end = self.node_start[node], self.node_end[node]
+            points = self._X[self.idx_array[start:end]]
+            self._set_bounds(node=node,
+                            points=points)
+            if 2 * node + 1 >= self.n_nodes:
+                continue
+            # partition rows around the median of the widest feature
+            feature = np.argmax(points.max(axis=0) - points.min(axis=0))
+            mid = (end - start) // 2
+            order = np.argpartition(points[:, feature], mid)
+            self.idx_array[start:end] = self.idx_array[start:end][order]
+            left, right = 2 * node + 1, 2 * node + 2
+            self.node_start[left], self.node_end[left] = start, start + mid
+            self.node_start[right], self.node_end[right] = start + mid, end
+
+    def _distances(self,
+                    x:np.array,
+                    points:np.array)->np.ndarray:
+        '''Function to compute minkowski distances from x to every point
+        '''
+        if self._p == 2:
+            return np.sqrt(np.sum((points - x)**2, axis=1))
+        return np.sum(np.abs(points - x), axis=1)
+
+    def _leaf_distances(self,
+                        x:np.array,
+                        inds:np.array,
+                        alive:np.array or None)->np.ndarray:
+        '''Function to compute distances from x to the rows inds, removed rows are infinitely far
+        '''
+        distances = self._distances(x=x, points=self._X[inds])
+        if alive is not None:
+            distances[~alive[inds]] = np.inf
+        return distances
+
+    def query(self,
+                X:np.array,
+                k:int,
+                alive:np.array or None=None):
+        """Function to find the k nearest training rows of every query
+
+        Subtrees whose minimum possible distance to the query exceeds the
+        current k-th best distance are pruned.
+
+        Args:
+            X : ndarray of shape (n_queries, n_features)
+            k : number of neighbors, k <= n_samples
+            alive : boolean mask of rows that may be returned, None means all
+
+        Returns:
+            (ndarray, ndarray): sorted distances and training indices,
+            both of shape (n_queries, k)
+        """
+        neigh_dist = np.empty((X.shape[0], k))
+        neigh_ind = np.empty((X.shape[0], k), dtype=np.intp)
+        for row, x in enumerate(X):
+            best_dist = np.full(k, np.inf)
+            best_ind = np.full(k, -1, dtype=np.intp)
+            stack = [(self._min_dist(nodes=np.array([0]), x=x)[0], 0)]
+            while stack:
+                bound, node = stack.pop()
+                if bound > best_dist[-1]:
+                    continue
+                left = 2 * node + 1
+                if left >= self.n_nodes:
+                    # leaf: brute force over its rows and merge with the current best
+                    inds = self.idx_array[self.node_start[node]:self.node_end[node]]
+                    distances = self._leaf_distances(x=x, inds=inds, alive=alive)
+                    cand_dist = np.concatenate((best_dist, distances))
+                    cand_ind = np.concatenate((best_ind, inds))
+                    order = np.argsort(cand_dist, kind='stable')[:k]
+                    best_dist, best_ind = cand_dist[order], cand_ind[order]
+                    continue
+                children = np.array([left, left + 1])
+                child_bounds = self._min_dist(nodes=children, x=x)
+                # push the farther child first so the nearer one is visited next
+                for pos in np.argsort(-child_bounds, kind='stable'):
+                    if child_bounds[pos] <= best_dist[-1]:
+                        stack.append((child_bounds[pos], children[pos]))
+            neigh_dist[row], neigh_ind[row] = best_dist, best_ind
+        return neigh_dist, neigh_ind
+
+    def query_radius(self,
+                    X:np.array,
+                    radius:float,
+                    alive:np.array or None=None):
+        """Function to find all training rows within radius of every query
+
+        Args:
+            X : ndarray of shape (n_queries, n_features)
+            radius : maximum distance of a neighbor
+            alive : boolean mask of rows that may be returned, None means all
+
+        Returns:
+            (list, list): per query arrays of distances and training
+            indices, sorted by increasing distance
+        """
+        neigh_dist, neigh_ind = [], []
+        for x in X:
+            found_dist, found_ind = [np.zeros(0)], [np.zeros(0, dtype=np.intp)]
+            stack = [0]
+            while stack:
+                node = stack.pop()
+                left = 2 * node + 1
+                if left >= self.n_nodes:
+                    inds = self.idx_array[self.node_start[node]:self.node_end[node]]
+                    distances = self._leaf_distances(x=x, inds=inds, alive=alive)
+                    mask = distances <= radius
+                    found_dist.append(distances[mask])
+                    found_ind.append(inds[mask])
+                    continue
+                children = np.array([left, left + 1])
+                stack.extend(children[self._min_dist(nodes=children, x=x) <= radius])
+            found_dist, found_ind = np.concatenate(found_dist), np.concatenate(found_ind)
+            order = np.argsort(found_dist, kind='stable')
+            neigh_dist.append(found_dist[order])
+            neigh_ind.append(found_ind[order])
+        return neigh_dist, neigh_ind
+
+class _KDTree(_BinaryTree):
+    """KD-tree: every node is bounded by the axis-aligned box of its rows.
+    """
+    def _allocate_bounds(self):
+        self.node_lower = np.zeros((self.n_nodes, self._X.shape[1]))
+        self.node_upper = np.zeros((self.n_nodes, self._X.shape[1]))
+
+    def _set_bounds(self,
+                    node:int,
+                    points:np.array):
+        self.node_lower[node] = points.min(axis=0)
+        self.node_upper[node] = points.max(axis=0)
+
+    def _min_dist(self,
+                    nodes:np.array,
+                    x:np.array)->np.ndarray:
+        '''Function to compute the minkowski distance from x to the boxes of nodes
+        '''
+        gap = np.maximum(np.maximum(self.node_lower[nodes] - x, x - self.node_upper[nodes]), 0)
+        if self._p == 2:
+            return np.sqrt(np.sum(gap**2, axis=1))
+        return np.sum(gap, axis=1)
+
+class _BallTree(_BinaryTree):
+    """Ball tree: every node is bounded by a ball around the centroid of its rows.
+
+    Queries walk the tree one by one in Python, which is usually slower
+    than the tiled brute-force kernel, so it is only used when requested.
+    """
+    def _allocate_bounds(self):
+        self.node_centroid = np.zeros((self.n_nodes, self._X.shape[1]))
+        self.node_radius = np.zeros(self.n_nodes)
+
+    def _set_bounds(self,
+                    node:int,
+                    points:np.array):
+        self.node_centroid[node] = points.mean(axis=0)
+        self.node_radius[node] = self._distances(x=self.node_centroid[node], points=points).max()
+
+    def _min_dist(self,
+                    nodes:np.array,
+                    x:np.array)->np.ndarray:
+        '''Function to compute the minkowski distance from x to the balls of nodes
+        '''
+        centroid_dist = self._distances(x=x, points=self.node_centroid[nodes])
+        return np.maximum(centroid_dist - self.node_radius[nodes], 0)
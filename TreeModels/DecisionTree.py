@@ -1,9 +1,17 @@
+import os
+import copy
+import heapq
+import functools
 import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from TreeIO import _save_arrays, _load_arrays
 
 def _np_check(func):
         """Decorator for check X argument
         """
+        # keep the name, bound methods stored on a model are pickled by name
+        @functools.wraps(func)
         def inner(*args, **kwargs):
             for num, arg in enumerate(args):
                 if type(arg) == np.ndarray:
@@ -29,7 +37,10 @@ class _Node():
                 left:np.array or None=None, 
                 right:np.array or None=None, 
                 coeff:float or None=None, 
-                value:float or None=None):
+                value:float or None=None, 
+                missing_left:bool=False, 
+                categories:np.array or None=None, 
+                weight:float or None=None):
         '''Constructor
         ''' 
         # for decision node
@@ -38,188 +49,1033 @@ class _Node():
         self.left = left
         self.right = right
         self.coeff = coeff
+        self.missing_left = missing_left
+        self.categories = categories
         
-        # for leaf node
+        # for every node, a node without children is a leaf
         self.value = value
+        self.weight = weight
+
+class _Tree():
+    """Fitted decision tree compiled into parallel node arrays.
+
+    Node 0 is the root. An internal node i sends a row x to left[i] if
+    x[feature[i]] <= threshold[i] and to right[i] otherwise. A categorical
+    node sends x left if cat_table[cat_split[i], x[feature[i]]] is set.
+    Missing values, and categories unknown to the table, go left if
+    missing_left[i] is set. Leaves have feature, left and right equal to -1.
+    Every node holds the prediction and the total sample weight of the
+    training samples that reached it, so a tree can be cut at any node.
+
+    Parameters
+    ----------
+    feature : ndarray of shape (n_nodes,)
+        Split feature of every node, -1 for leaves.
+
+    threshold : ndarray of shape (n_nodes,)
+        Split threshold of every node.
+
+    left, right : ndarray of shape (n_nodes,)
+        Child node indices, -1 for leaves.
+
+    value : ndarray of shape (n_nodes,)
+        Prediction of every node.
+
+    coeff : ndarray of shape (n_nodes,)
+        Impurity decrease of every split.
+
+    weight : ndarray of shape (n_nodes,)
+        Total training sample weight of every node.
+
+    missing_left : ndarray of shape (n_nodes,)
+        Whether missing values go to the left child.
+
+    cat_split : ndarray of shape (n_nodes,)
+        Row of cat_table of every categorical split, -1 for numeric splits.
+
+    cat_table : ndarray of shape (n_categorical_splits, n_categories)
+        Boolean masks of the categories that go to the left child.
+    """
+    # names of the node arrays, also the constructor arguments
+    _ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'coeff', 'weight', 'missing_left', 'cat_split', 'cat_table')
+
+    def __init__(self, 
+                feature:np.array, 
+                threshold:np.array, 
+                left:np.array, 
+                right:np.array, 
+                value:np.array, 
+                coeff:np.array, 
+                weight:np.array, 
+                missing_left:np.array, 
+                cat_split:np.array, 
+                cat_table:np.array):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.coeff = coeff
+        self.weight = weight
+        self.missing_left = missing_left
+        self.cat_split = cat_split
+        self.cat_table = cat_table
+        self.n_nodes = len(feature)
+
+    def apply(self, 
+                X:np.array, 
+                depth:int or None=None)->np.ndarray:
+        """Function to find the leaf of every row
+
+        All rows advance one level per iteration, so the Python loop runs
+        once per tree level instead of once per row and node.
+
+        Args:
+            X : ndarray of shape (n_samples, n_features)
+            depth : rows stop after this many splits, None means at the leaves
+
+        Returns:
+            np.ndarray: leaf index of every row, or the node it stopped at
+        """
+        node = np.zeros(X.shape[0], dtype=np.intp)
+        active = np.arange(X.shape[0])[self.feature[node] >= 0]
+        n_steps = 0
+        while len(active) > 0 and (depth is None or n_steps < depth):
+            n_steps += 1
+            curr = node[active]
+            feature_values = X[active, self.feature[curr]]
+            go_left = feature_values <= self.threshold[curr]
+            missing = np.isnan(feature_values)
+            is_cat = self.cat_split[curr] >= 0
+            if is_cat.any():
+                codes = feature_values[is_cat]
+                # unknown categories are treated like missing values
+                known = (codes >= 0) & (codes < self.cat_table.shape[1])
+                cat_left = np.zeros(len(codes), dtype=bool)
+                cat_left[known] = self.cat_table[self.cat_split[curr[is_cat]][known], codes[known].astype(np.intp)]
+                go_left[is_cat] = cat_left
+                missing[is_cat] = ~known
+            go_left = np.where(missing, self.missing_left[curr], go_left)
+            node[active] = np.where(go_left, self.left[curr], self.right[curr])
+            active = active[self.feature[node[active]] >= 0]
+        return node
+
+class _QuantileAccumulator():
+    """Running weighted alpha-quantile and pinball loss of a growing set of values.
+
+    The smallest values holding an alpha share of the weight live in a
+    max-heap and the others in a min-heap, both with running weighted sums.
+    Adding a value costs O(log n) and the loss around the current quantile
+    is read in O(1), so a threshold sweep never rescans the samples.
+
+    Parameters
+    ----------
+    alpha : float
+        Quantile level in (0, 1), 0.5 gives the median and absolute error.
+    """
+    def __init__(self, 
+                alpha:float):
+        self.alpha = alpha
+        # heap entries are (value, weight), low holds negated values to act as a max-heap
+        self.low, self.high = [], []
+        self.sum_low, self.sum_high = 0., 0.
+        self.weight_low, self.weight_high = 0., 0.
+
+    def push(self, 
+            value:float, 
+            weight:float=1.):
+        """Function to add one value"""
+        if self.low and value > -self.low[0][0]:
+            heapq.heappush(self.high, (value, weight))
+            self.sum_high += weight * value
+            self.weight_high += weight
+        else:
+            heapq.heappush(self.low, (-value, weight))
+            self.sum_low += weight * value
+            self.weight_low += weight
+        # rebalance so the low heap holds the smallest values reaching alpha of the weight,
+        # with unit weights these are exactly ceil(alpha * n) values
+        target = self.alpha * (self.weight_low + self.weight_high)
+        while len(self.low) > 1 and self.weight_low - self.low[0][1] >= target:
+            value, weight = heapq.heappop(self.low)
+            self.sum_low += weight * value
+            self.weight_low -= weight
+            heapq.heappush(self.high, (-value, weight))
+            self.sum_high -= weight * value
+            self.weight_high += weight
+        while self.high and self.weight_low < target:
+            value, weight = heapq.heappop(self.high)
+            self.sum_high -= weight * value
+            self.weight_high -= weight
+            heapq.heappush(self.low, (-value, weight))
+            self.sum_low += weight * value
+            self.weight_low += weight
+
+    def loss(self)->float:
+        """Function to compute the summed weighted pinball loss around the current quantile"""
+        if not self.low:
+            return 0.
+        quantile = -self.low[0][0]
+        return self.alpha * (self.sum_high - quantile * self.weight_high) + (1 - self.alpha) * (quantile * self.weight_low - self.sum_low)
+
+    def losses(self, 
+                values:np.array, 
+                weights:np.array)->np.ndarray:
+        """Function to add values one by one and return the loss after every addition"""
+        losses = np.empty(len(values))
+        for pos, (value, weight) in enumerate(zip(values, weights)):
+            self.push(value=value, 
+                        weight=weight)
+            losses[pos] = self.loss()
+        return losses
 
 class _DecisionInfo():
-    def __init__(self):
-        pass
+    def __init__(self, 
+                alpha:float=0.5, 
+                loss_scale:float=1.):
+        self.__alpha = alpha
+        self.__loss_scale = loss_scale
 
-    @_np_check
     def __gini_index(self, 
+                    stats:np.array):
+        '''Function to compute gini index from count and class counts on the last axis
+        '''
+        return 1 - np.sum(stats[..., 1:]**2, axis=-1) / stats[..., 0]**2
+
+    def __entropy(self, 
+                    stats:np.array):
+        '''Function to compute entropy in bits from count and class counts on the last axis
+        '''
+        p_cls = stats[..., 1:] / stats[..., :1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return -np.sum(np.where(p_cls > 0, p_cls * np.log2(p_cls), 0), axis=-1)
+
+    def __variance(self, 
+                    stats:np.array):
+        '''Function to compute variance from count, sum and sum of squares on the last axis
+        '''
+        mean = stats[..., 1] / stats[..., 0]
+        return np.maximum(stats[..., 2] / stats[..., 0] - mean**2, 0)
+
+    @_np_check
+    def _class_codes(self, 
                     Y:np.array):
-        '''Function to compute gini index
+        '''Function to encode the classes of Y as integer codes 0..n_classes-1
         '''
-        class_labels = np.unique(Y)
-        gini = 0
-        for cls in class_labels:
-            p_cls = len(Y[Y == cls]) / len(Y)
-            gini += p_cls**2
-        return 1 - gini
+        _, codes = np.unique(Y, return_inverse=True)
+        return codes.ravel()
+
+    @_np_check
+    def _reg_stats(self, 
+                    Y:np.array, 
+                    W:np.array):
+        '''Function to compute per sample statistics of variance (weight, weighted sum, weighted sum of squares)
+        '''
+        # center the target so the sum of squares does not lose precision
+        Y = Y - np.average(Y, weights=W)
+        return np.column_stack((W, W * Y, W * Y**2))
 
     @_np_check
     def _information_gain(self, 
                             parent:np.array, 
                             l_child:np.array, 
                             r_child:np.array):
-        '''Function to compute information gain
+        '''Function to compute information gain from summed class statistics
+        
+        l_child and r_child may hold one row of statistics per candidate threshold
         '''
-        weight_l = len(l_child) / len(parent)
-        weight_r = len(r_child) / len(parent)
+        weight_l = l_child[..., 0] / parent[0]
+        weight_r = r_child[..., 0] / parent[0]
 
-        return self.__gini_index(Y=parent) - (weight_l*self.__gini_index(Y=l_child) + weight_r*self.__gini_index(Y=r_child))
+        return self.__gini_index(stats=parent) - (weight_l*self.__gini_index(stats=l_child) + weight_r*self.__gini_index(stats=r_child))
     
+    @_np_check
+    def _entropy_gain(self, 
+                        parent:np.array, 
+                        l_child:np.array, 
+                        r_child:np.array):
+        '''Function to compute information gain with entropy from summed class statistics
+        
+        l_child and r_child may hold one row of statistics per candidate threshold
+        '''
+        weight_l = l_child[..., 0] / parent[0]
+        weight_r = r_child[..., 0] / parent[0]
+
+        return self.__entropy(stats=parent) - (weight_l*self.__entropy(stats=l_child) + weight_r*self.__entropy(stats=r_child))
+
+    def __class_child_sums(self, 
+                            func, 
+                            parent:np.array, 
+                            shift:np.array, 
+                            codes:np.array, 
+                            W:np.array):
+        '''Function to sum func over the class weights of both children after every sorted position
+
+        The left child holds the statistics shift and the sorted samples up to
+        the position, the right child the rest of parent. Moving a sample of
+        class c to the left only changes the terms of class c, so the sums are
+        cumulative sums of these changes and no (n_samples, n_classes) array
+        is built.
+        Returns the weight of the left child and the sums of the left and
+        the right child, each of shape (len(codes),)
+        '''
+        # weight of the own class among the preceding samples, an exclusive cumsum per class
+        order = np.argsort(codes, kind='stable')
+        sorted_codes, sorted_w = codes[order], W[order]
+        before = np.cumsum(sorted_w) - sorted_w
+        before -= before[np.searchsorted(sorted_codes, sorted_codes, side='left')]
+        l_start = np.empty(len(codes))
+        l_start[order] = before
+        l_start += shift[1:][codes]
+        r_start = parent[1:][codes] - l_start
+        l_sum = np.sum(func(shift[1:])) + np.cumsum(func(l_start + W) - func(l_start))
+        r_sum = np.sum(func(parent[1:] - shift[1:])) + np.cumsum(func(r_start - W) - func(r_start))
+        return shift[0] + np.cumsum(W), l_sum, r_sum
+
+    @staticmethod
+    def __xlogx(x:np.array)->np.ndarray:
+        '''Function to compute x * ln(x) with 0 for x <= 0
+        '''
+        x = np.asarray(x, dtype=np.float64)
+        return x * np.log(x, out=np.zeros_like(x), where=x > 0)
+
+    def _information_gain_sweep(self, 
+                                parent:np.array, 
+                                shift:np.array, 
+                                codes:np.array, 
+                                W:np.array):
+        '''Function to compute information gain after every sorted position from class codes
+
+        With L the class weights of a child, its weighted gini index is
+        w - sum(L**2) / w, so the gain only needs the sums of squares.
+        Returns the gain after every sorted position
+        '''
+        w_l, sq_l, sq_r = self.__class_child_sums(func=np.square, 
+                                                    parent=parent, 
+                                                    shift=shift, 
+                                                    codes=codes, 
+                                                    W=W)
+        w_r = parent[0] - w_l
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.__gini_index(stats=parent) - 1 + (sq_l / w_l + sq_r / w_r) / parent[0]
+
+    def _entropy_gain_sweep(self, 
+                            parent:np.array, 
+                            shift:np.array, 
+                            codes:np.array, 
+                            W:np.array):
+        '''Function to compute information gain with entropy after every sorted position from class codes
+
+        With L the class weights of a child, its weighted entropy is
+        (w * ln(w) - sum(L * ln(L))) / ln(2), so the gain only needs these sums.
+        Returns the gain after every sorted position
+        '''
+        w_l, xlogx_l, xlogx_r = self.__class_child_sums(func=self.__xlogx, 
+                                                        parent=parent, 
+                                                        shift=shift, 
+                                                        codes=codes, 
+                                                        W=W)
+        w_r = parent[0] - w_l
+        children = self.__xlogx(w_l) - xlogx_l + self.__xlogx(w_r) - xlogx_r
+        return self.__entropy(stats=parent) - children / (parent[0] * np.log(2))
+
     @_np_check
     def _variance_reduction(self, 
                             parent:np.array, 
                             l_child:np.array, 
                             r_child:np.array):
-        '''Function to compute variance reduction
+        '''Function to compute variance reduction from summed variance statistics
+        
+        l_child and r_child may hold one row of statistics per candidate threshold
         '''
-        weight_l = len(l_child) / len(parent)
-        weight_r = len(r_child) / len(parent)
-        reduction = np.var(parent) - (weight_l * np.var(l_child) + weight_r * np.var(r_child))
+        weight_l = l_child[..., 0] / parent[0]
+        weight_r = r_child[..., 0] / parent[0]
+        reduction = self.__variance(stats=parent) - (weight_l * self.__variance(stats=l_child) + weight_r * self.__variance(stats=r_child))
         return reduction
     
+    @_np_check
+    def _friedman_mse(self, 
+                        parent:np.array, 
+                        l_child:np.array, 
+                        r_child:np.array):
+        '''Function to compute Friedman's improvement from counts and sums only
+
+        w_l * w_r * (mean_l - mean_r)**2 does not need the sum of squares,
+        so it does not suffer from its cancellation
+        '''
+        weight_l = l_child[..., 0] / parent[0]
+        weight_r = r_child[..., 0] / parent[0]
+        diff = l_child[..., 1] / l_child[..., 0] - r_child[..., 1] / r_child[..., 0]
+        return weight_l * weight_r * diff**2
+
+    def _quantile_reduction(self, 
+                            Y:np.array, 
+                            Y_missing:np.array, 
+                            W:np.array, 
+                            W_missing:np.array):
+        '''Function to compute the pinball loss reduction of every threshold of sorted targets
+
+        The left losses are accumulated front to back and the right losses
+        back to front, both with O(log n) heap updates per sample. The
+        targets of samples with a missing value, Y_missing, join the right
+        (row 0) or the left (row 1) child. W and W_missing are the sample
+        weights of the targets.
+        Returns coefficients of shape (2, len(Y)) for the thresholds after
+        every sorted position, the last one keeps only missing samples right
+        '''
+        total_weight = np.sum(W) + np.sum(W_missing)
+        curr_coeff = np.full((2, len(Y)), -np.inf)
+        for direction in range(2 if len(Y_missing) > 0 else 1):
+            l_acc, r_acc = _QuantileAccumulator(alpha=self.__alpha), _QuantileAccumulator(alpha=self.__alpha)
+            (r_acc if direction == 0 else l_acc).losses(values=Y_missing, 
+                                                        weights=W_missing)
+            r_empty = r_acc.loss()
+            l_loss = l_acc.losses(values=Y, 
+                                    weights=W)
+            r_loss = np.append(r_acc.losses(values=Y[::-1], 
+                                            weights=W[::-1])[::-1], r_empty)
+            total = l_loss[-1] if direction == 1 else r_loss[0]
+            curr_coeff[direction] = self.__loss_scale * (total - l_loss - r_loss[1:]) / total_weight
+        # the left child can not take every present sample and the missing ones
+        curr_coeff[1, -1] = -np.inf
+        return curr_coeff
+
+    def _impurity(self, 
+                    criterion:str, 
+                    stats:np.array, 
+                    Y:np.array, 
+                    W:np.array)->float:
+        '''Function to compute the impurity of a node from its summed statistics, or from its targets for quantile criteria
+        '''
+        if criterion == 'gini':
+            return self.__gini_index(stats=stats)
+        if criterion in ['entropy', 'log_loss']:
+            return self.__entropy(stats=stats)
+        if criterion in ['squared_error', 'friedman_mse']:
+            return self.__variance(stats=stats)
+        order = np.argsort(Y, kind='stable')
+        return self.__loss_scale * _QuantileAccumulator(alpha=self.__alpha).losses(values=Y[order], 
+                                                                                    weights=W[order])[-1] / np.sum(W)
+
+    def _class_order_key(self, 
+                        stats:np.array)->np.ndarray:
+        '''Function to order categories by the share of the most frequent class, empty ones last
+        
+        For two classes this is the Fisher ordering that contains the optimal split
+        '''
+        major = np.argmax(stats[:, 1:].sum(axis=0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(stats[:, 0] > 0, stats[:, 1 + major] / stats[:, 0], np.inf)
+
+    def _reg_order_key(self, 
+                        stats:np.array)->np.ndarray:
+        '''Function to order categories by their mean target, empty ones last
+        '''
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(stats[:, 0] > 0, stats[:, 1] / stats[:, 0], np.inf)
+
     @_np_check
     def _calculate_leaf_value_class(self, 
-                                Y:np.array):
-        '''Function to compute leaf node
+                                Y:np.array, 
+                                W:np.array):
+        '''Function to compute leaf node, the class with the largest weight
         '''
-        Y = list(Y)
-        return max(Y, key=Y.count)
+        classes, codes = np.unique(Y, return_inverse=True)
+        return classes[np.argmax(np.bincount(codes, weights=W))]
     
     @_np_check
     def _calculate_leaf_value_reg(self, 
-                                Y:np.array):
+                                Y:np.array, 
+                                W:np.array):
+        '''Function to compute leaf node
+        '''
+        return np.average(Y, weights=W)
+
+    @_np_check
+    def _calculate_leaf_value_quantile(self, 
+                                        Y:np.array, 
+                                        W:np.array):
         '''Function to compute leaf node
+
+        Takes the smallest target whose cumulative weight reaches alpha and
+        averages it with the next one when the cumulative weight lands exactly
+        on alpha, so an integer weight gives the same value as repeated rows
         '''
-        return np.mean(Y)
+        positive = W > 0
+        Y, W = Y[positive], W[positive]
+        order = np.argsort(Y, kind='stable')
+        Y, cum_weight = Y[order], np.cumsum(W[order])
+        target = self.__alpha * cum_weight[-1]
+        # alpha times the total weight is rarely exact in floating point
+        tolerance = 1e-9 * cum_weight[-1]
+        index = np.searchsorted(cum_weight, target - tolerance)
+        if (cum_weight[index] <= target + tolerance) & (index + 1 < len(Y)):
+            return (Y[index] + Y[index + 1]) / 2
+        return Y[index]
 
 class _DecisionBuild(_DecisionInfo):
     def __init__(self,
                 task:str,
                 min_samples_split:int,
-                max_depth:int):
-        super().__init__()
+                max_depth:int or None,
+                max_bins:int or None=None,
+                max_leaf_nodes:int or None=None,
+                min_impurity_decrease:float=0.,
+                n_jobs:int or None=None,
+                criterion:str or None=None,
+                alpha:float=0.5,
+                max_features:int or float or str or None=None,
+                random_state:int or None=None,
+                categorical_features:list or None=None,
+                ccp_alpha:float=0.):
+        self.__task = task
+        self.__criterion = criterion or ('gini' if task == 'class' else 'squared_error')
+        self.__alpha = alpha
+        # the pinball loss at the median is half the absolute error
+        super().__init__(alpha=0.5 if self.__criterion == 'absolute_error' else alpha, 
+                        loss_scale=2. if self.__criterion == 'absolute_error' else 1.)
         self.__min_samples_split = min_samples_split
         self.__max_depth = max_depth
-        self.__use_func = super()._information_gain if task == 'class' else super()._variance_reduction
-        self.__use_leaf = super()._calculate_leaf_value_class if task == 'class' else super()._calculate_leaf_value_reg
+        self.__max_bins = max_bins
+        self.__max_leaf_nodes = max_leaf_nodes
+        self.__min_impurity_decrease = min_impurity_decrease
+        self.__n_jobs = n_jobs
+        self.__executor = None
+        self.__root = None
+        self.__max_features = max_features
+        self.__random_state = random_state
+        self.__categorical_features = categorical_features
+        self.__ccp_alpha = ccp_alpha
+        criteria = {'gini': super()._information_gain, 
+                    'entropy': super()._entropy_gain, 
+                    'log_loss': super()._entropy_gain, 
+                    'squared_error': super()._variance_reduction, 
+                    'friedman_mse': super()._friedman_mse, 
+                    'absolute_error': super()._quantile_reduction, 
+                    'quantile': super()._quantile_reduction}
+        self.__use_func = criteria.get(self.__criterion)
+        # quantile criteria can not be summed from per sample statistics, they sweep the sorted targets
+        self.__use_sweep = self.__criterion in ['absolute_error', 'quantile']
+        class_sweeps = {'gini': super()._information_gain_sweep, 
+                        'entropy': super()._entropy_gain_sweep, 
+                        'log_loss': super()._entropy_gain_sweep}
+        self.__use_class_sweep = class_sweeps.get(self.__criterion)
+        self.__use_key = super()._class_order_key if task == 'class' else super()._reg_order_key
+        if task == 'class':
+            self.__use_leaf = super()._calculate_leaf_value_class
+        else:
+            self.__use_leaf = super()._calculate_leaf_value_quantile if self.__use_sweep else super()._calculate_leaf_value_reg
 
-    @_np_check
     def __split(self, 
-                dataset:np.array, 
-                feature_index:int, 
-                threshold:int or float):
-        '''Function to split the data
+                start:int, 
+                end:int, 
+                best_split:dict)->int:
+        '''Function to partition the samples of a node in place
+
+        After the call samples[start:mid] go to the left child and
+        samples[mid:end] to the right child, mid is returned
+        '''
+        node_samples = self.__samples[start:end]
+        feature_values = self.__X[node_samples, best_split["feature_index"]]
+        if "categories" in best_split:
+            mask = np.isin(feature_values, best_split["categories"])
+        else:
+            mask = feature_values<=best_split.get("bin", best_split["threshold"])
+        # missing values are NaN, or the last code in binned mode
+        missing = np.isnan(feature_values) if self.__max_bins is None else feature_values == self.__max_bins
+        mask = np.where(missing, best_split["missing_left"], mask)
+        mid = start + np.count_nonzero(mask)
+        self.__samples[start:mid], self.__samples[mid:end] = node_samples[mask], node_samples[~mask]
+        return mid
+
+    def __map(self, 
+                func, 
+                items:list, 
+                parallel:bool=True)->list:
+        '''Function to map func over items, on the thread pool if there is one
+        '''
+        if self.__executor is None or not parallel or len(items) < 2:
+            return [func(item) for item in items]
+        return list(self.__executor.map(func, items))
+
+    def __sweep(self, 
+                parent:np.array, 
+                l_child:np.array, 
+                missing:np.array, 
+                valid:np.array)->np.ndarray:
+        '''Function to score the candidate splits of a cumulative sweep
+
+        l_child holds the statistics of the present samples left of every
+        candidate and missing those of the samples with a missing value,
+        which join the right (row 0) or the left (row 1) child.
+        Returns coefficients of shape (2,) + valid.shape
+        '''
+        curr_coeff = np.full((2,) + valid.shape, -np.inf)
+        for direction, shift in enumerate([0, missing]):
+            if direction == 1 and not np.any(missing[..., 0] > 0):
+                break
+            left_stats = l_child + shift
+            right_stats = parent - left_stats
+            ok = valid & (left_stats[..., 0] > 0) & (right_stats[..., 0] > 0)
+            curr_coeff[direction][ok] = self.__use_func(parent=parent, l_child=left_stats[ok], r_child=right_stats[ok])
+        return curr_coeff
+
+    def __category_stats(self, 
+                            codes:np.array, 
+                            samples:np.array, 
+                            feature_index:int)->np.ndarray:
+        '''Function to sum the split statistics of samples per category
+        '''
+        return self.__sum_stats(samples=samples, 
+                                groups=codes, 
+                                n_groups=self.__n_categories[feature_index])
+
+    def __sum_stats(self, 
+                    samples:np.array, 
+                    groups:np.array or None=None, 
+                    n_groups:int=1)->np.ndarray:
+        '''Function to sum the split statistics of samples, per group if groups are given
+
+        Class statistics (weight, class weights) are summed from the class
+        codes with one bincount, no one-hot rows are stored per sample.
+        Returns an array of shape (n_stats,), or (n_groups, n_stats) with groups
+        '''
+        if self.__task != 'class' and groups is None:
+            return self.__stats[samples].sum(axis=0)
+        flat_groups = np.zeros(len(samples), dtype=np.intp) if groups is None else groups
+        if self.__task == 'class':
+            class_weights = np.bincount(flat_groups * self.__n_classes + self.__codes[samples], 
+                                        weights=self.__w[samples], 
+                                        minlength=n_groups * self.__n_classes).reshape(n_groups, self.__n_classes)
+            stats = np.column_stack((class_weights.sum(axis=1), class_weights))
+        else:
+            stats = self.__stats[samples]
+            stats = np.column_stack([np.bincount(flat_groups, weights=stats[:, stat_index], minlength=n_groups) 
+                                    for stat_index in range(stats.shape[1])])
+        return stats if groups is not None else stats[0]
+
+    def __get_feature_split(self, 
+                            node_samples:np.array, 
+                            parent:np.array, 
+                            feature_index:int):
+        '''Function to find the best split of one feature
+
+        Samples with a missing value join the child that scores better, if
+        the node has none they go with the larger child. The categories of
+        a categorical feature are ranked by __use_key (Fisher ordering) and
+        the ranks are swept like numeric values.
+
+        Returns (coeff, split), coeff is -inf if the feature can not split the node
         '''
-        dataset_left = np.array([row for row in dataset if row[feature_index]<threshold])
-        dataset_right = np.array([row for row in dataset if row[feature_index]>=threshold])
-        return dataset_left, dataset_right
+        feature_values = self.__X[node_samples, feature_index]
+        missing = np.isnan(feature_values)
+        present, feature_values = node_samples[~missing], feature_values[~missing]
+        if len(present) == 0:
+            return -np.inf, None
+        ranking = None
+        if feature_index in self.__n_categories:
+            codes = feature_values.astype(np.intp)
+            ranking = np.argsort(self.__use_key(stats=self.__category_stats(codes=codes, 
+                                                                            samples=present, 
+                                                                            feature_index=feature_index)), kind='stable')
+            rank = np.empty(len(ranking))
+            rank[ranking] = np.arange(len(ranking))
+            feature_values = rank[codes]
+        # sort the feature once, the thresholds are swept over the sorted values
+        order = np.argsort(feature_values, kind='stable')
+        feature_values, present = feature_values[order], present[order]
+        # a threshold is only possible between two different values, after the
+        # last value it leaves only the missing samples on the right
+        valid = np.append(feature_values[:-1] < feature_values[1:], missing.any())
+        if not valid.any():
+            return -np.inf, None
+        if self.__use_sweep:
+            curr_coeff = self.__use_func(Y=self.__y[present], 
+                                        Y_missing=self.__y[node_samples[missing]], 
+                                        W=self.__w[present], 
+                                        W_missing=self.__w[node_samples[missing]])
+            curr_coeff[:, ~valid] = -np.inf
+        elif self.__task == 'class':
+            curr_coeff = np.full((2, len(present)), -np.inf)
+            missing_stats = self.__sum_stats(samples=node_samples[missing])
+            for direction, shift in enumerate([np.zeros_like(parent), missing_stats]):
+                if direction == 1 and not missing_stats[0] > 0:
+                    break
+                gain = self.__use_class_sweep(parent=parent, 
+                                                    shift=shift, 
+                                                    codes=self.__codes[present], 
+                                                    W=self.__w[present])
+                # the right child is only empty if the last position also takes the missing samples,
+                # a weight difference would not show it under rounding
+                ok = valid.copy()
+                ok[-1] &= direction == 0
+                curr_coeff[direction][ok] = gain[ok]
+        else:
+            # statistics of the left child when the threshold lies after sorted position i
+            curr_coeff = self.__sweep(parent=parent, 
+                                        l_child=np.cumsum(self.__stats[present], axis=0), 
+                                        missing=self.__stats[node_samples[missing]].sum(axis=0), 
+                                        valid=valid)
+        direction, pos = np.unravel_index(np.argmax(curr_coeff), curr_coeff.shape)
+        split = {"missing_left": bool(direction) if missing.any() else 2 * (pos + 1) >= len(present)}
+        if ranking is not None:
+            split["threshold"] = 0.
+            split["categories"] = np.sort(ranking[:int(feature_values[pos]) + 1])
+        elif pos == len(present) - 1:
+            split["threshold"] = np.inf
+        else:
+            threshold = (feature_values[pos] + feature_values[pos+1]) / 2
+            # the midpoint of two neighbouring floats may round up to the right value
+            if threshold == feature_values[pos+1]:
+                threshold = feature_values[pos]
+            split["threshold"] = threshold
+        return curr_coeff[direction, pos], split
+
+    def __draw_features(self)->np.ndarray:
+        '''Function to draw the features searched at a node, in increasing order
+        '''
+        num_features = self.__num_features
+        if self.__max_features is None:
+            return np.arange(num_features)
+        if self.__max_features == 'sqrt':
+            n_draw = int(np.sqrt(num_features))
+        elif self.__max_features == 'log2':
+            n_draw = int(np.log2(num_features))
+        elif isinstance(self.__max_features, float):
+            n_draw = int(self.__max_features * num_features)
+        else:
+            n_draw = self.__max_features
+        n_draw = min(max(1, n_draw), num_features)
+        return np.sort(self.__rng.choice(num_features, size=n_draw, replace=False))
 
     @_np_check
     def __get_best_split(self, 
-                        dataset:np.array, 
-                        num_features:int):
+                        node_samples:np.array, 
+                        features:np.array, 
+                        min_parallel:int=1024):
         '''Function to find the best split
+
+        Features are searched on the thread pool for nodes with at least
+        min_parallel samples, smaller nodes are not worth the overhead
         '''
         # dictionary to store the best split
         best_split = {}
         max_coeff = -float("inf")
+        parent = self.__sum_stats(samples=node_samples)
+        feature_splits = self.__map(func=lambda feature_index: self.__get_feature_split(node_samples=node_samples, 
+                                                                                        parent=parent, 
+                                                                                        feature_index=feature_index), 
+                                    items=features, 
+                                    parallel=len(node_samples) >= min_parallel)
         
-        # loop over all the features
-        for feature_index in range(num_features):
-            feature_values = dataset[:, feature_index]
-            possible_thresholds = np.unique(feature_values)
-            # loop over all the feature values present in the data
-            for threshold in possible_thresholds:
-                # get current split
-                dataset_left, dataset_right = self.__split(dataset=dataset, 
-                                                            feature_index=feature_index, 
-                                                            threshold=threshold)
-                # check if childs are not null
-                if len(dataset_left)>0 and len(dataset_right)>0:
-                    y, left_y, right_y = dataset[:, -1], dataset_left[:, -1], dataset_right[:, -1]
-                    # compute information gain
-                    curr_coeff = self.__use_func(parent=y, l_child=left_y, r_child=right_y)
-                    # update the best split if needed
-                    if curr_coeff>max_coeff:
-                        best_split["feature_index"] = feature_index
-                        best_split["threshold"] = threshold
-                        best_split["dataset_left"] = dataset_left
-                        best_split["dataset_right"] = dataset_right
-                        best_split["coeff"] = curr_coeff
-                        max_coeff = curr_coeff
+        # reduce over the features in order, the first best feature wins ties
+        for feature_index, (curr_coeff, split) in zip(features, feature_splits):
+            # update the best split if needed
+            if curr_coeff>max_coeff:
+                best_split = dict(split)
+                best_split["feature_index"] = int(feature_index)
+                best_split["coeff"] = curr_coeff
+                max_coeff = curr_coeff
                         
         # return best split
         return best_split
 
-    @_np_check
-    def __build_tree(self, 
-                    dataset:np.array, 
-                    curr_depth:int=0):
-        '''Recursive function to build the tree
-        ''' 
-        X, Y = dataset[:,:-1], dataset[:,-1]
-        num_samples, num_features = np.shape(X)
+    def __bin_features(self, 
+                        X:np.array)->np.ndarray:
+        '''Function to quantile-bin every feature into uint8 codes
         
-        # split until stopping conditions are met
-        if num_samples>=self.__min_samples_split and curr_depth<=self.__max_depth:
-            # find the best split
-            best_split = self.__get_best_split(dataset=dataset, 
-                                                num_features=num_features)
-            # check if information gain is positive
-            try:
-                if best_split["coeff"]>0:
-                    # recur left
-                    left_subtree = self.__build_tree(dataset=best_split["dataset_left"], 
-                                                    curr_depth=curr_depth+1)
-                    # recur right
-                    right_subtree = self.__build_tree(dataset=best_split["dataset_right"], 
-                                                    curr_depth=curr_depth+1)
-                    # return decision node
-                    return _Node(best_split["feature_index"], best_split["threshold"], 
-                                left_subtree, right_subtree, best_split["coeff"])
-            except:
-                pass
+        The code of a value x is the number of bin edges below x, so code <= b
+        is the same condition as x <= edges[b] on the raw data. Categorical
+        features keep their integer codes and missing values get the code
+        max_bins.
+        '''
+        self.__bin_edges = []
+        codes = np.empty(X.shape, dtype=np.uint8)
+        for feature_index in range(X.shape[1]):
+            missing = np.isnan(X[:, feature_index])
+            present = X[~missing, feature_index]
+            if feature_index in self.__n_categories:
+                edges = np.zeros(0)
+                codes[~missing, feature_index] = present
+            else:
+                feature_values = np.unique(present)
+                if len(feature_values) <= self.__max_bins:
+                    # every distinct value gets its own bin
+                    edges = (feature_values[:-1] + feature_values[1:]) / 2
+                else:
+                    edges = np.unique(np.quantile(present, np.linspace(0, 1, self.__max_bins + 1)[1:-1]))
+                codes[~missing, feature_index] = np.searchsorted(edges, present, side='left')
+            codes[missing, feature_index] = self.__max_bins
+            self.__bin_edges.append(edges)
+        return codes
+
+    def __histogram(self, 
+                    node_samples:np.array, 
+                    num_features:int, 
+                    chunk_size:int=65536)->np.ndarray:
+        '''Function to sum the split statistics per feature and bin
+
+        Nodes larger than chunk_size are split into sample chunks whose
+        histograms are built on the thread pool and summed.
+
+        Returns an array of shape (num_features, max_bins + 1, n_stats), the
+        last bin holds the samples with a missing value
+        '''
+        if self.__executor is not None and len(node_samples) > chunk_size:
+            chunks = [node_samples[start:start+chunk_size] for start in range(0, len(node_samples), chunk_size)]
+            return np.sum(self.__map(func=lambda chunk: self.__histogram(node_samples=chunk, 
+                                                                        num_features=num_features, 
+                                                                        chunk_size=chunk_size), 
+                                    items=chunks), axis=0)
+        n_bins = self.__max_bins + 1
+        # one bincount per statistic over the flat (feature, bin) index
+        flat_bins = (self.__X[node_samples].astype(np.intp) + np.arange(num_features) * n_bins).ravel()
+        hist = self.__sum_stats(samples=np.repeat(node_samples, num_features), 
+                                groups=flat_bins, 
+                                n_groups=num_features * n_bins)
+        return hist.reshape(num_features, n_bins, hist.shape[1])
+
+    def __get_best_bin_split(self, 
+                            hist:np.array, 
+                            features:np.array):
+        '''Function to find the best split between the bins of a histogram
+
+        The histogram covers all features so that children can be derived by
+        subtraction, only the rows of features are searched. The bins of
+        categorical features are ranked by __use_key first.
+        '''
+        best_split = {}
+        parent = hist[0].sum(axis=0)
+        bins, missing = hist[features, :-1], hist[features, -1]
+        rankings = {}
+        for row, feature_index in enumerate(features):
+            if feature_index in self.__n_categories:
+                rankings[row] = np.argsort(self.__use_key(stats=bins[row]), kind='stable')
+                bins[row] = bins[row][rankings[row]]
+        # statistics of the left child when the threshold is the upper edge of bin b
+        l_child = np.cumsum(bins, axis=1)
+        curr_coeff = self.__sweep(parent=parent, 
+                                    l_child=l_child, 
+                                    missing=missing[:, None, :], 
+                                    valid=np.ones(l_child.shape[:2], dtype=bool))
+        if not np.isfinite(curr_coeff).any():
+            return best_split
+        direction, row, bin_index = np.unravel_index(np.argmax(curr_coeff), curr_coeff.shape)
+        feature_index = features[row]
+        best_split["feature_index"] = int(feature_index)
+        best_split["bin"] = bin_index
+        if row in rankings:
+            best_split["threshold"] = 0.
+            best_split["categories"] = np.sort(rankings[row][:bin_index+1][bins[row, :bin_index+1, 0] > 0])
+        else:
+            edges = self.__bin_edges[feature_index]
+            best_split["threshold"] = edges[bin_index] if bin_index < len(edges) else np.inf
+        if missing[row, 0] > 0:
+            best_split["missing_left"] = bool(direction)
+        else:
+            best_split["missing_left"] = bool(2 * l_child[row, bin_index, 0] >= parent[0])
+        best_split["coeff"] = curr_coeff[direction, row, bin_index]
+        return best_split
+
+    def __evaluate_node(self, 
+                        start:int, 
+                        end:int, 
+                        curr_depth:int, 
+                        hist:np.array or None=None):
+        '''Function to find the split of a node, an empty dict means the node is a leaf
+
+        In binned mode hist holds the histogram of the node if the parent
+        already derived it by subtraction
+        '''
+        node_samples = self.__samples[start:end]
+        Y = self.__y[node_samples]
+        num_samples, num_features = end - start, self.__num_features
+        best_split = {}
         
-        # compute leaf node
-        leaf_value = self.__use_leaf(Y=Y)
-        # return leaf node
-        return _Node(value=leaf_value)
-    
+        # split until stopping conditions are met, a pure node can not be improved
+        if num_samples>=self.__min_samples_split and (self.__max_depth is None or curr_depth<=self.__max_depth) and not np.all(Y == Y[0]):
+            # find the best split over a random subset of the features
+            features = self.__draw_features()
+            if self.__max_bins is None:
+                best_split = self.__get_best_split(node_samples=node_samples, 
+                                                    features=features)
+            else:
+                if hist is None:
+                    hist = self.__histogram(node_samples=node_samples, 
+                                            num_features=num_features)
+                best_split = self.__get_best_bin_split(hist=hist, 
+                                                        features=features)
+        if len(best_split) > 0:
+            # impurity decrease weighted by the fraction of training weight in the node
+            best_split["gain"] = best_split["coeff"] * np.sum(self.__w[node_samples]) / self.__total_weight
+            # check if information gain is positive and large enough
+            if best_split["coeff"]<=0 or best_split["gain"]<self.__min_impurity_decrease:
+                best_split = {}
+        best_split["hist"] = hist
+        return best_split
+
+    def __build_tree(self)->_Node:
+        '''Function to grow the tree without recursion
+
+        Without max_leaf_nodes the pending nodes form a stack and the tree
+        grows depth first. With max_leaf_nodes they form a priority queue and
+        the node with the largest weighted impurity decrease is split first
+        until the tree has max_leaf_nodes leaves.
+        ''' 
+        best_first = self.__max_leaf_nodes is not None
+        root = _Node()
+        # pending entries: (-gain, counter, node, start, end, depth, best_split)
+        pending = []
+        n_leaves = 1
+        counter = 0
+
+        def push(node, start, end, curr_depth, hist=None):
+            nonlocal counter
+            best_split = self.__evaluate_node(start=start, 
+                                                end=end, 
+                                                curr_depth=curr_depth, 
+                                                hist=hist)
+            # every node keeps its prediction so the tree can be pruned or cut at any depth
+            node.value = self.__use_leaf(Y=self.__y[self.__samples[start:end]], 
+                                        W=self.__w[self.__samples[start:end]])
+            node.weight = np.sum(self.__w[self.__samples[start:end]])
+            if "coeff" not in best_split:
+                return
+            entry = (-best_split["gain"], counter, node, start, end, curr_depth, best_split)
+            counter += 1
+            if best_first:
+                heapq.heappush(pending, entry)
+            else:
+                pending.append(entry)
+
+        push(node=root, 
+            start=0, 
+            end=len(self.__samples), 
+            curr_depth=0)
+        while pending:
+            _, _, node, start, end, curr_depth, best_split = heapq.heappop(pending) if best_first else pending.pop()
+            if best_first and n_leaves >= self.__max_leaf_nodes:
+                continue
+            mid = self.__split(start=start, 
+                                end=end, 
+                                best_split=best_split)
+            left_hist = right_hist = None
+            if self.__max_bins is not None:
+                # scan only the smaller child, the larger one is parent minus sibling
+                hist = best_split["hist"]
+                if mid - start <= end - mid:
+                    left_hist = self.__histogram(node_samples=self.__samples[start:mid], 
+                                                num_features=self.__num_features)
+                    right_hist = hist - left_hist
+                else:
+                    right_hist = self.__histogram(node_samples=self.__samples[mid:end], 
+                                                num_features=self.__num_features)
+                    left_hist = hist - right_hist
+            # make decision node
+            node.feature_index = best_split["feature_index"]
+            node.threshold = best_split["threshold"]
+            node.coeff = best_split["coeff"]
+            node.missing_left = best_split["missing_left"]
+            node.categories = best_split.get("categories")
+            node.left, node.right = _Node(), _Node()
+            n_leaves += 1
+            push(node=node.right, 
+                start=mid, 
+                end=end, 
+                curr_depth=curr_depth+1, 
+                hist=right_hist)
+            push(node=node.left, 
+                start=start, 
+                end=mid, 
+                curr_depth=curr_depth+1, 
+                hist=left_hist)
+        return root
+
+    def __compile(self, 
+                    root:_Node)->_Tree:
+        '''Function to convert the node objects into node arrays in preorder
+        '''
+        stack = [(root, -1, False)]
+        feature, threshold, left, right, coeff, value, weight = [], [], [], [], [], [], []
+        missing_left, cat_split, cat_rows = [], [], []
+        while stack:
+            node, parent, is_left = stack.pop()
+            node_id = len(feature)
+            if parent >= 0:
+                (left if is_left else right)[parent] = node_id
+            left.append(-1)
+            right.append(-1)
+            value.append(node.value)
+            weight.append(node.weight)
+            if node.left is None:
+                feature.append(-1)
+                threshold.append(0.)
+                coeff.append(0.)
+                missing_left.append(False)
+                cat_split.append(-1)
+            else:
+                feature.append(node.feature_index)
+                threshold.append(node.threshold)
+                coeff.append(node.coeff)
+                missing_left.append(node.missing_left)
+                if node.categories is None:
+                    cat_split.append(-1)
+                else:
+                    cat_split.append(len(cat_rows))
+                    cat_rows.append(node.categories)
+                # the left child is popped first and gets the next index
+                stack.append((node.right, node_id, False))
+                stack.append((node.left, node_id, True))
+        cat_table = np.zeros((len(cat_rows), max(self.__n_categories.values(), default=0)), dtype=bool)
+        for row, categories in enumerate(cat_rows):
+            cat_table[row, categories] = True
+        return _Tree(feature=np.array(feature, dtype=np.intp), 
+                    threshold=np.array(threshold, dtype=np.float64), 
+                    left=np.array(left, dtype=np.intp), 
+                    right=np.array(right, dtype=np.intp), 
+                    value=np.array(value), 
+                    coeff=np.array(coeff, dtype=np.float64), 
+                    weight=np.array(weight, dtype=np.float64), 
+                    missing_left=np.array(missing_left, dtype=bool), 
+                    cat_split=np.array(cat_split, dtype=np.intp), 
+                    cat_table=cat_table)
+
     def _print_tree(self, 
-                    tree:_Node or None=None, 
+                    tree:int or None=None, 
                     indent:str=" "):
         """Function to print the tree
         
         Args:
-            tree (_Node): Tree Nodes
+            tree (int): Node index, None means the root
             indent (strinf): Name
         """        
         if tree is None:
-            tree = self.__root
+            tree = 0
+        nodes = self.__root
 
-        if tree.value is not None:
-            print(tree.value)
+        if nodes.feature[tree] < 0:
+            print(nodes.value[tree])
 
         else:
-            print("X_"+str(tree.feature_index), "<=", tree.threshold, "Gini =", tree.coeff)
+            if nodes.cat_split[tree] >= 0:
+                print("X_"+str(nodes.feature[tree]), "in", np.flatnonzero(nodes.cat_table[nodes.cat_split[tree]]).tolist(), "Gini =", nodes.coeff[tree])
+            else:
+                print("X_"+str(nodes.feature[tree]), "<=", nodes.threshold[tree], "Gini =", nodes.coeff[tree])
             print("%sleft:" % (indent), end="")
-            self.print_tree(tree=tree.left, indent=indent + indent)
+            self.print_tree(tree=nodes.left[tree], indent=indent + indent)
             print("%sright:" % (indent), end="")
-            self.print_tree(tree=tree.right, indent=indent + indent)
+            self.print_tree(tree=nodes.right[tree], indent=indent + indent)
 
     def _fit(self, 
             X:np.array or pd.DataFrame or pd.Series,
-            y:np.array or pd.Series):
+            y:np.array or pd.Series,
+            sample_weight:np.array or pd.Series or None=None):
         """Function to train the tree
 
         Args:
             X (np.array or pd.DataFrame or pd.Series): Train data
             y (np.array or pd.Series): Target array
+            sample_weight (np.array or pd.Series or None): Non-negative weight of every sample, None means equal weights
 
         Returns:
             _type_: Self fit
@@ -236,51 +1092,255 @@ class _DecisionBuild(_DecisionInfo):
         else:
             raise Exception('Argument y must be only pandas Series and has some X len')
         
-        y = y.reshape(-1,1)
-        dataset = np.concatenate((X, y), axis=1)
-        self.__root = self.__build_tree(dataset=dataset)
+        y = np.array(y)
+        X = np.asarray(X, dtype=np.float64)
+        if sample_weight is None:
+            sample_weight = np.ones(len(y))
+        else:
+            sample_weight = np.asarray(sample_weight, dtype=np.float64)
+            assert \
+            (sample_weight.shape == y.shape) and np.all(sample_weight >= 0) and np.sum(sample_weight) > 0, \
+            'Argument sample_weight must be only non-negative numbers with a positive sum and has some X len'
+        self.__num_features = X.shape[1]
+        # categorical columns hold integer codes 0..n_categories-1 or NaN
+        self.__n_categories = {}
+        for feature_index in self.__categorical_features or []:
+            assert \
+            feature_index < X.shape[1], \
+            'Argument categorical_features must only hold column indices of X'
+            codes = X[~np.isnan(X[:, feature_index]), feature_index]
+            assert \
+            np.all(codes >= 0) & np.all(codes == np.floor(codes)), \
+            'Categorical features must only hold non-negative integer codes or NaN'
+            self.__n_categories[feature_index] = int(codes.max()) + 1 if len(codes) > 0 else 1
+            assert \
+            (self.__max_bins is None) or (self.__n_categories[feature_index] <= self.__max_bins), \
+            'Categorical features must have at most max_bins categories in binned mode'
+        # split statistics are computed once, every node sums a subset of them,
+        # classes are kept as codes and summed per node
+        self.__stats, self.__codes = None, None
+        if self.__task == 'class':
+            self.__codes = super()._class_codes(Y=y)
+            self.__n_classes = int(self.__codes.max()) + 1
+        else:
+            self.__stats = super()._reg_stats(Y=y, 
+                                                W=sample_weight)
+        self.__y = y
+        self.__w = sample_weight
+        self.__total_weight = np.sum(sample_weight)
+        # column-major storage makes the per-feature gathers contiguous
+        self.__X = np.asfortranarray(X if self.__max_bins is None else self.__bin_features(X=X))
+        # nodes own contiguous slices of one index array that is partitioned in place,
+        # samples without weight take no part in training
+        self.__samples = np.flatnonzero(sample_weight > 0)
+        self.__rng = np.random.default_rng(self.__random_state)
+        n_jobs = self.__n_jobs or 1
+        if n_jobs < 0:
+            n_jobs = os.cpu_count()
+        if n_jobs == 1:
+            root = self.__build_tree()
+        else:
+            # the NumPy kernels of the split search release the GIL
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                self.__executor = executor
+                try:
+                    root = self.__build_tree()
+                finally:
+                    self.__executor = None
+        self.__root = self.__compile(root=root)
+        self.__root_impurity = super()._impurity(criterion=self.__criterion, 
+                                                    stats=self.__sum_stats(samples=self.__samples), 
+                                                    Y=self.__y[self.__samples], 
+                                                    W=self.__w[self.__samples])
+        if self.__ccp_alpha > 0:
+            _, _, internal = self.__weakest_links(tree=self.__root, 
+                                                    ccp_alpha=self.__ccp_alpha)
+            self.__root = self.__prune(tree=self.__root, 
+                                        internal=internal)
+        # the fitted tree does not keep the training data
+        del self.__X, self.__y, self.__w, self.__stats, self.__codes, self.__samples, self.__rng
         return self.__root
     
-    @_np_check
-    def __make_prediction(self, 
-                            X:np.array, 
-                            tree:_Node):
-        '''Function to predict a single data point
-        '''
-        if tree.value!=None: 
-            return tree.value
-        feature_val = X[tree.feature_index]
-        if feature_val<=tree.threshold:
-            return self.__make_prediction(X=X, tree=tree.left)
-        else:
-            return self.__make_prediction(X=X, tree=tree.right)
-        
     def _predict(self, 
                 X:np.array or pd.DataFrame or pd.Series,
-                tree:_Node)->np.ndarray:
+                tree:_Tree,
+                depth:int or None=None)->np.ndarray:
         """Function to predict new dataset
 
         Args:
             X (np.array or pd.DataFrame or pd.Series): Predict data
-            tree (_Node): Tree Nodes
+            tree (_Tree): Node arrays
+            depth (int or None): Number of splits a row passes at most, None means all
 
         Returns:
             np.ndarray: Predict result (np.ndarray)
         """
-        if isinstance(X, np.ndarray)==False:
-            X = np.array(X)
-        preditions = [self.__make_prediction(X=x, tree=tree) for x in X]
-        return np.array(preditions)
+        assert \
+        (depth is None) or (isinstance(depth, int) and depth >= 0), \
+        'Argument depth must be only integer or None in the range [0, inf)'
+        X = np.asarray(X, dtype=np.float64)
+        return tree.value[tree.apply(X=X, depth=depth)]
+
+    def __levels(self, 
+                tree:_Tree)->list:
+        '''Function to group the node indices of a tree by depth
+        '''
+        levels = [np.array([0])]
+        while True:
+            nodes = levels[-1][tree.feature[levels[-1]] >= 0]
+            if len(nodes) == 0:
+                return levels
+            levels.append(np.concatenate((tree.left[nodes], tree.right[nodes])))
+
+    def __reachable(self, 
+                    tree:_Tree, 
+                    internal:np.array, 
+                    levels:list)->np.ndarray:
+        '''Function to mark the nodes still reachable when only the internal nodes split
+        '''
+        alive = np.zeros(tree.n_nodes, dtype=bool)
+        alive[0] = True
+        for level in levels:
+            nodes = level[alive[level] & internal[level]]
+            alive[tree.left[nodes]] = True
+            alive[tree.right[nodes]] = True
+        return alive
+
+    def __weakest_links(self, 
+                        tree:_Tree, 
+                        ccp_alpha:float):
+        '''Function to run minimal cost-complexity pruning on node arrays
+
+        Splitting node t lowers the weighted impurity of the tree by
+        coeff[t] * weight[t] / weight[0]. The effective alpha of an internal
+        node is the decrease of its whole subtree divided by its number of
+        leaves minus one, the subtrees with the smallest effective alpha are
+        pruned first until it exceeds ccp_alpha.
+
+        Returns (ccp_alphas, impurity_decreases, internal): the effective
+        alpha of every pruning step starting at 0, the impurity decrease of
+        the tree left after it and the nodes that still split
+        '''
+        levels = self.__levels(tree=tree)
+        internal = tree.feature >= 0
+        gain = np.where(internal, tree.coeff * tree.weight / tree.weight[0], 0.)
+        ccp_alphas, decreases = [], []
+        alpha = 0.
+        while True:
+            # sum the decreases and count the leaves of every subtree bottom up
+            subtree_gain = np.where(internal, gain, 0.)
+            n_leaves = np.where(internal, 0, 1)
+            for level in reversed(levels):
+                nodes = level[internal[level]]
+                subtree_gain[nodes] += subtree_gain[tree.left[nodes]] + subtree_gain[tree.right[nodes]]
+                n_leaves[nodes] = n_leaves[tree.left[nodes]] + n_leaves[tree.right[nodes]]
+            ccp_alphas.append(alpha)
+            decreases.append(subtree_gain[0] if internal[0] else 0.)
+            if not internal[0]:
+                break
+            effective = np.where(internal, subtree_gain / np.maximum(n_leaves - 1, 1), np.inf)
+            weakest = effective.min()
+            if weakest > ccp_alpha:
+                break
+            internal &= effective > weakest
+            internal &= self.__reachable(tree=tree, 
+                                            internal=internal, 
+                                            levels=levels)
+            alpha = weakest
+        return ccp_alphas, decreases, internal
+
+    def __prune(self, 
+                tree:_Tree, 
+                internal:np.array)->_Tree:
+        '''Function to turn the nodes that do not split any more into leaves and drop their subtrees
+        '''
+        keep = np.flatnonzero(self.__reachable(tree=tree, 
+                                                internal=internal, 
+                                                levels=self.__levels(tree=tree)))
+        # removing whole subtrees keeps the preorder, only the indices shift
+        new_index = np.full(tree.n_nodes, -1, dtype=np.intp)
+        new_index[keep] = np.arange(len(keep))
+        is_leaf = ~internal[keep]
+        return _Tree(feature=np.where(is_leaf, -1, tree.feature[keep]), 
+                    threshold=np.where(is_leaf, 0., tree.threshold[keep]), 
+                    left=np.where(is_leaf, -1, new_index[tree.left[keep]]), 
+                    right=np.where(is_leaf, -1, new_index[tree.right[keep]]), 
+                    value=tree.value[keep], 
+                    coeff=np.where(is_leaf, 0., tree.coeff[keep]), 
+                    weight=tree.weight[keep], 
+                    missing_left=np.where(is_leaf, False, tree.missing_left[keep]), 
+                    cat_split=np.where(is_leaf, -1, tree.cat_split[keep]), 
+                    cat_table=tree.cat_table)
+
+    def _cost_complexity_pruning_path(self, 
+                                        X:np.array or pd.DataFrame or pd.Series,
+                                        y:np.array or pd.Series,
+                                        sample_weight:np.array or pd.Series or None=None)->dict:
+        """Function to compute the pruning path of a tree grown on X and y without pruning
+
+        The fitted tree of the model is not changed.
+
+        Returns:
+            dict: ccp_alphas, the effective alphas of the pruning steps, and
+            impurities, the weighted leaf impurity of the tree after each step
+        """
+        model = copy.copy(self)
+        model.__ccp_alpha = 0.
+        tree = model._fit(X, y, sample_weight)
+        ccp_alphas, decreases, _ = self.__weakest_links(tree=tree, 
+                                                        ccp_alpha=np.inf)
+        return {"ccp_alphas": np.array(ccp_alphas), 
+                "impurities": model.__root_impurity - np.array(decreases)}
+
+    @property
+    def tree_(self)->_Tree:
+        """Node arrays of the fitted tree"""
+        return self.__root
+
+    def _save(self, 
+                path:str, 
+                kind:str):
+        """Function to write the node arrays of the fitted tree to a binary file
+
+        Args:
+            path (str): File path
+            kind (str): Public class name checked on load
+        """
+        assert \
+        self.__root is not None, \
+        'The tree must be fitted before it is saved'
+        _save_arrays(path=path, 
+                    kind=kind, 
+                    params={"task": self.__task}, 
+                    arrays={name: getattr(self.__root, name) for name in _Tree._ARRAYS})
+
+    def _load(self, 
+                path:str, 
+                kind:str, 
+                mmap_mode:str or None='r')->_Tree:
+        """Function to read the node arrays written by _save
+
+        Returns:
+            _Tree: Node arrays, memory mapped unless mmap_mode is None
+        """
+        _, arrays = _load_arrays(path=path, 
+                                kind=kind, 
+                                mmap_mode=mmap_mode)
+        self.__root = _Tree(**arrays)
+        return self.__root
     
     def _check_params(self):
         """Check input parameters
         """
-        if isinstance(self.__max_depth, int):
-            assert \
-            self.__max_depth > 0, \
-            'Argument max_depth must be only integer in the range [1, inf)'
+        if self.__max_depth is None:
+            pass
         else:
-            raise Exception('Argument max_depth must be only integer')
+            if isinstance(self.__max_depth, int):
+                assert \
+                self.__max_depth > 0, \
+                'Argument max_depth must be only integer or None in the range [1, inf)'
+            else:
+                raise Exception('Argument max_depth must be only integer or None')
         
         if isinstance(self.__min_samples_split, int):
             assert \
@@ -289,127 +1349,476 @@ class _DecisionBuild(_DecisionInfo):
         else:
             raise Exception('Argument min_samples_split must be only integer')
 
+        if self.__max_bins is None:
+            pass
+        else:
+            if isinstance(self.__max_bins, int):
+                assert \
+                (self.__max_bins > 1)&(self.__max_bins <= 255), \
+                'Argument max_bins must be only integer or None in the range [2, 255]'
+            else:
+                raise Exception('Argument max_bins must be only integer or None')
+
+        if self.__max_leaf_nodes is None:
+            pass
+        else:
+            if isinstance(self.__max_leaf_nodes, int):
+                assert \
+                self.__max_leaf_nodes > 1, \
+                'Argument max_leaf_nodes must be only integer or None in the range [2, inf)'
+            else:
+                raise Exception('Argument max_leaf_nodes must be only integer or None')
+
+        if (isinstance(self.__min_impurity_decrease, int)) | (isinstance(self.__min_impurity_decrease, float)):
+            assert \
+            self.__min_impurity_decrease >= 0, \
+            'Argument min_impurity_decrease must be only integer or float in the range [0, inf)'
+        else:
+            raise Exception('Argument min_impurity_decrease must be only integer or float')
+
+        if self.__n_jobs is not None:
+            if isinstance(self.__n_jobs, int):
+                assert \
+                self.__n_jobs != 0, \
+                'Argument n_jobs must be only integer or None and not 0'
+            else:
+                raise Exception('Argument n_jobs must be only integer or None')
+
+        criterion_list = ['gini', 'entropy', 'log_loss'] if self.__task == 'class' else ['squared_error', 'friedman_mse', 'absolute_error', 'quantile']
+        if isinstance(self.__criterion, str):
+            assert \
+            self.__criterion in criterion_list, \
+            f'Argument criterion must be only string and one of {criterion_list}'
+        else:
+            raise Exception(f'Argument criterion must be only string and one of {criterion_list}')
+
+        assert \
+        (self.__max_bins is None) | (self.__use_sweep == False), \
+        'Argument criterion absolute_error or quantile needs max_bins None'
+
+        if (isinstance(self.__alpha, int)) | (isinstance(self.__alpha, float)):
+            assert \
+            (self.__alpha > 0)&(self.__alpha < 1), \
+            'Argument alpha must be only integer or float in the range (0, 1)'
+        else:
+            raise Exception('Argument alpha must be only integer or float')
+
+        if self.__max_features is None:
+            pass
+        elif isinstance(self.__max_features, str):
+            assert \
+            self.__max_features in ['sqrt', 'log2'], \
+            'Argument max_features must be only string sqrt or log2, integer, float or None'
+        elif isinstance(self.__max_features, int):
+            assert \
+            self.__max_features > 0, \
+            'Argument max_features must be only integer in the range [1, inf)'
+        elif isinstance(self.__max_features, float):
+            assert \
+            (self.__max_features > 0)&(self.__max_features <= 1), \
+            'Argument max_features must be only float in the range (0, 1]'
+        else:
+            raise Exception('Argument max_features must be only string sqrt or log2, integer, float or None')
+
+        if self.__random_state is not None:
+            if isinstance(self.__random_state, int):
+                assert \
+                self.__random_state >= 0, \
+                'Argument random_state must be only integer or None in the range [0, inf)'
+            else:
+                raise Exception('Argument random_state must be only integer or None')
+
+        if (isinstance(self.__ccp_alpha, int)) | (isinstance(self.__ccp_alpha, float)):
+            assert \
+            self.__ccp_alpha >= 0, \
+            'Argument ccp_alpha must be only integer or float in the range [0, inf)'
+        else:
+            raise Exception('Argument ccp_alpha must be only integer or float')
+
+        if self.__categorical_features is None:
+            pass
+        else:
+            if isinstance(self.__categorical_features, (list, tuple, np.ndarray)):
+                assert \
+                all((isinstance(feature_index, (int, np.integer)))&(feature_index >= 0) for feature_index in self.__categorical_features), \
+                'Argument categorical_features must be only list of column indices or None'
+            else:
+                raise Exception('Argument categorical_features must be only list of column indices or None')
+
 class DecisionTreeClass(_DecisionBuild):
     """Classification implementing the Dicision Tree
-    max_depth : int, default=2
+    criterion : {'gini', 'entropy', 'log_loss'}, default='gini'
+        The function to measure the quality of a split. 'entropy' and
+        'log_loss' both use the information gain in bits.
+
+    max_depth : int or None, default=2
         The maximum depth of the tree. If None, then nodes are expanded until
         all leaves are pure or until all leaves contain less than
         min_samples_split samples.
 
     min_samples_split : int or float, default=2
         The minimum number of samples required to split an internal node
+
+    max_bins : int or None, default=None
+        If int, every feature is quantile-binned into at most max_bins
+        uint8 codes before training and splits are searched on per-node
+        histograms, values must be in the range `[2, 255]`. The code 255
+        is left for missing values.
+        If None, all thresholds between distinct values are searched.
+
+    max_leaf_nodes : int or None, default=None
+        If int, the tree grows best first: the leaf whose split has the
+        largest weighted impurity decrease is split next until there are
+        max_leaf_nodes leaves. If None, the tree grows depth first.
+
+    min_impurity_decrease : float, default=0.
+        A node is split only if the impurity decrease of the split weighted
+        by the fraction of training samples in the node is at least this
+        value.
+
+    n_jobs : int or None, default=None
+        Number of threads that search the features of large nodes in
+        parallel, in binned mode they build histograms of sample chunks.
+        None means 1, -1 means all processors.
+
+    max_features : int, float, {'sqrt', 'log2'} or None, default=None
+        The number of features searched at every node, drawn at random
+        without replacement. A float is a fraction of the features, None
+        means all features.
+
+    random_state : int or None, default=None
+        Seed of the feature draws.
+
+    categorical_features : list of int or None, default=None
+        Indices of columns holding integer category codes 0..K-1. Their
+        categories are ordered by the mean target (class share) of the node
+        and split into two sets, without one-hot expansion.
+
+    ccp_alpha : float, default=0.
+        Complexity parameter of minimal cost-complexity pruning. After
+        fitting, the subtrees whose weighted impurity decrease per removed
+        leaf is at most ccp_alpha are pruned. See cost_complexity_pruning_path.
+
+    Missing values (NaN) are supported in every column: each split learns
+    whether they go left or right, unknown categories are treated the same.
     """
     def __init__(self, 
                 min_samples_split:int=2, 
-                max_depth:int=2):
+                max_depth:int or None=2, 
+                max_bins:int or None=None, 
+                max_leaf_nodes:int or None=None, 
+                min_impurity_decrease:float=0., 
+                n_jobs:int or None=None, 
+                criterion:str='gini', 
+                max_features:int or float or str or None=None, 
+                random_state:int or None=None, 
+                categorical_features:list or None=None, 
+                ccp_alpha:float=0.):
         
         # initialize the root of the tree 
         self.__root = None
         super().__init__(task='class', 
                         min_samples_split=min_samples_split,
-                        max_depth=max_depth)
+                        max_depth=max_depth,
+                        max_bins=max_bins,
+                        max_leaf_nodes=max_leaf_nodes,
+                        min_impurity_decrease=min_impurity_decrease,
+                        n_jobs=n_jobs,
+                        criterion=criterion,
+                        max_features=max_features,
+                        random_state=random_state,
+                        categorical_features=categorical_features,
+                        ccp_alpha=ccp_alpha)
         super()._check_params()
 
     @_np_check
     def fit(self, 
             X: pd.Series or pd.DataFrame or np.array, 
-            y: pd.Series or np.array):
+            y: pd.Series or np.array, 
+            sample_weight: pd.Series or np.array or None = None):
         """Function to train the tree
 
         Args:
             X (np.arrayorpd.DataFrameorpd.Series): Train data
             y (np.arrayorpd.Series): Target array
+            sample_weight (np.arrayorpd.SeriesorNone): Weight of every sample, e.g. bootstrap counts or class balancing. Defaults to None
 
         Returns:
             _type_: Self fit
         """
-        self.__root = super()._fit(X, y)
+        self.__root = super()._fit(X, y, sample_weight)
         return self
 
     @_np_check
     def predict(self, 
-                X: np.array or pd.DataFrame or pd.Series):
+                X: np.array or pd.DataFrame or pd.Series, 
+                depth: int or None = None):
         """Function to predict new dataset
 
         Args:
             X (np.array or pd.DataFrame or pd.Series): Predict data
+            depth (int or None): Cut the tree after this many splits and predict with the node reached. Defaults to None
 
         Returns:
             np.ndarray: Predict result (np.ndarray)
         """
-        return super()._predict(X=X, tree=self.__root)
+        return super()._predict(X=X, tree=self.__root, depth=depth)
+
+    @_np_check
+    def cost_complexity_pruning_path(self, 
+                                    X: pd.Series or pd.DataFrame or np.array, 
+                                    y: pd.Series or np.array, 
+                                    sample_weight: pd.Series or np.array or None = None):
+        """Function to compute the pruning path of minimal cost-complexity pruning
+
+        A tree is grown on X and y with the parameters of the model and
+        ccp_alpha=0, the fitted tree of the model is not changed.
+
+        Args:
+            X (np.arrayorpd.DataFrameorpd.Series): Train data
+            y (np.arrayorpd.Series): Target array
+            sample_weight (np.arrayorpd.SeriesorNone): Weight of every sample. Defaults to None
+
+        Returns:
+            dict: ccp_alphas, the increasing effective alphas of the pruning
+            steps, and impurities, the total leaf impurity after each step
+        """
+        return super()._cost_complexity_pruning_path(X, y, sample_weight)
 
     def print_tree(self, 
-                    tree: _Node = None, 
+                    tree: int = None, 
                     indent: str = " "):
         """Function to print the tree
         
         Args:
-            tree (_Node): Tree Nodes
+            tree (int): Node index, None means the root
             indent (strinf): Name
         """  
         return super()._print_tree(tree=tree, 
                                     indent=indent)
+
+    def save(self, 
+            path: str):
+        """Function to save the fitted tree to a binary file
+
+        The node arrays are written as raw buffers that load() can map
+        from the file without reading them.
+
+        Args:
+            path (str): File path
+        """
+        super()._save(path=path, 
+                        kind='DecisionTreeClass')
+
+    @classmethod
+    def load(cls, 
+            path: str, 
+            mmap_mode: str or None = 'r'):
+        """Function to load a tree written by save
+
+        Args:
+            path (str): File path
+            mmap_mode (str or None): 'r' maps the node arrays read-only from the file, None reads them into memory. Defaults to 'r'
+
+        Returns:
+            DecisionTreeClass: Fitted tree
+        """
+        model = cls()
+        model.__root = model._load(path=path, 
+                                    kind='DecisionTreeClass', 
+                                    mmap_mode=mmap_mode)
+        return model
     
 class DecisionTreeReg(_DecisionBuild):
     '''Regression implementing the Decision Tree
-    max_depth : int, default=2
+    criterion : {'squared_error', 'friedman_mse', 'absolute_error', 'quantile'}, default='squared_error'
+        The function to measure the quality of a split. 'friedman_mse'
+        scores splits by the difference of the child means, 'absolute_error'
+        and 'quantile' minimize the pinball loss around the median or the
+        alpha-quantile and predict it in the leaves. The last two need
+        max_bins None.
+
+    alpha : float, default=0.5
+        Quantile level of the 'quantile' criterion, values must be in the
+        range `(0, 1)`.
+
+    max_depth : int or None, default=2
         The maximum depth of the tree. If None, then nodes are expanded until
         all leaves are pure or until all leaves contain less than
         min_samples_split samples.
 
     min_samples_split : int or float, default=2
         The minimum number of samples required to split an internal node
+
+    max_bins : int or None, default=None
+        If int, every feature is quantile-binned into at most max_bins
+        uint8 codes before training and splits are searched on per-node
+        histograms, values must be in the range `[2, 255]`. The code 255
+        is left for missing values.
+        If None, all thresholds between distinct values are searched.
+
+    max_leaf_nodes : int or None, default=None
+        If int, the tree grows best first: the leaf whose split has the
+        largest weighted impurity decrease is split next until there are
+        max_leaf_nodes leaves. If None, the tree grows depth first.
+
+    min_impurity_decrease : float, default=0.
+        A node is split only if the impurity decrease of the split weighted
+        by the fraction of training samples in the node is at least this
+        value.
+
+    n_jobs : int or None, default=None
+        Number of threads that search the features of large nodes in
+        parallel, in binned mode they build histograms of sample chunks.
+        None means 1, -1 means all processors.
+
+    max_features : int, float, {'sqrt', 'log2'} or None, default=None
+        The number of features searched at every node, drawn at random
+        without replacement. A float is a fraction of the features, None
+        means all features.
+
+    random_state : int or None, default=None
+        Seed of the feature draws.
+
+    categorical_features : list of int or None, default=None
+        Indices of columns holding integer category codes 0..K-1. Their
+        categories are ordered by the mean target (class share) of the node
+        and split into two sets, without one-hot expansion.
+
+    ccp_alpha : float, default=0.
+        Complexity parameter of minimal cost-complexity pruning. After
+        fitting, the subtrees whose weighted impurity decrease per removed
+        leaf is at most ccp_alpha are pruned. See cost_complexity_pruning_path.
+
+    Missing values (NaN) are supported in every column: each split learns
+    whether they go left or right, unknown categories are treated the same.
     '''
     
     def __init__(self, 
                 min_samples_split:int=2, 
-                max_depth:int=2):
+                max_depth:int or None=2, 
+                max_bins:int or None=None, 
+                max_leaf_nodes:int or None=None, 
+                min_impurity_decrease:float=0., 
+                n_jobs:int or None=None, 
+                criterion:str='squared_error', 
+                alpha:float=0.5, 
+                max_features:int or float or str or None=None, 
+                random_state:int or None=None, 
+                categorical_features:list or None=None, 
+                ccp_alpha:float=0.):
         
         # initialize the root of the tree 
         self.__root = None
         super().__init__(task='reg', 
                         min_samples_split=min_samples_split,
-                        max_depth=max_depth)
+                        max_depth=max_depth,
+                        max_bins=max_bins,
+                        max_leaf_nodes=max_leaf_nodes,
+                        min_impurity_decrease=min_impurity_decrease,
+                        n_jobs=n_jobs,
+                        criterion=criterion,
+                        alpha=alpha,
+                        max_features=max_features,
+                        random_state=random_state,
+                        categorical_features=categorical_features,
+                        ccp_alpha=ccp_alpha)
         super()._check_params()
         
     @_np_check
     def fit(self, 
         X: pd.Series or pd.DataFrame or np.array, 
-        y: pd.Series or np.array):
+        y: pd.Series or np.array, 
+        sample_weight: pd.Series or np.array or None = None):
         """Function to train the tree
 
         Args:
             X (np.arrayorpd.DataFrameorpd.Series): Train data
             y (np.arrayorpd.Series): Target array
+            sample_weight (np.arrayorpd.SeriesorNone): Weight of every sample, e.g. bootstrap counts. Defaults to None
 
         Returns:
             _type_: Self fit
         """
-        self.__root = super()._fit(X, y)
+        self.__root = super()._fit(X, y, sample_weight)
         return self
     
     @_np_check
     def predict(self, 
-                X: np.array or pd.DataFrame or pd.Series):
+                X: np.array or pd.DataFrame or pd.Series, 
+                depth: int or None = None):
         """Function to predict new dataset
 
         Args:
             X (np.array or pd.DataFrame or pd.Series): Predict data
+            depth (int or None): Cut the tree after this many splits and predict with the node reached. Defaults to None
 
         Returns:
             np.ndarray: Predict result (np.ndarray)
         """
-        return super()._predict(X=X, tree=self.__root)
+        return super()._predict(X=X, tree=self.__root, depth=depth)
+
+    @_np_check
+    def cost_complexity_pruning_path(self, 
+                                    X: pd.Series or pd.DataFrame or np.array, 
+                                    y: pd.Series or np.array, 
+                                    sample_weight: pd.Series or np.array or None = None):
+        """Function to compute the pruning path of minimal cost-complexity pruning
+
+        A tree is grown on X and y with the parameters of the model and
+        ccp_alpha=0, the fitted tree of the model is not changed.
+
+        Args:
+            X (np.arrayorpd.DataFrameorpd.Series): Train data
+            y (np.arrayorpd.Series): Target array
+            sample_weight (np.arrayorpd.SeriesorNone): Weight of every sample. Defaults to None
+
+        Returns:
+            dict: ccp_alphas, the increasing effective alphas of the pruning
+            steps, and impurities, the total leaf impurity after each step
+        """
+        return super()._cost_complexity_pruning_path(X, y, sample_weight)
 
     def print_tree(self, 
-                    tree: _Node = None, 
+                    tree: int = None, 
                     indent: str = " "):
         """Function to print the tree
         
         Args:
-            tree (_Node): Tree Nodes
+            tree (int): Node index, None means the root
             indent (strinf): Name
         """  
         return super()._print_tree(tree=tree, 
-                                    indent=indent)
\ No newline at end of file
+                                    indent=indent)
+
+    def save(self, 
+            path: str):
+        """Function to save the fitted tree to a binary file
+
+        The node arrays are written as raw buffers that load() can map
+        from the file without reading them.
+
+        Args:
+            path (str): File path
+        """
+        super()._save(path=path, 
+                        kind='DecisionTreeReg')
+
+    @classmethod
+    def load(cls, 
+            path: str, 
+            mmap_mode: str or None = 'r'):
+        """Function to load a tree written by save
+
+        Args:
+            path (str): File path
+            mmap_mode (str or None): 'r' maps the node arrays read-only from the file, None reads them into memory. Defaults to 'r'
+
+        Returns:
+            DecisionTreeReg: Fitted tree
+        """
+        model = cls()
+        model.__root = model._load(path=path, 
+                                    kind='DecisionTreeReg', 
+                                    mmap_mode=mmap_mode)
+        return model
@@ -1,4 +1,6 @@
 from DecisionTree import DecisionTreeReg
+from TreeEngine import _TreeEnsemble
+from TreeIO import _save_arrays, _load_arrays
 import numpy as np
 import pandas as pd
 from sklearn.metrics import mean_absolute_error, mean_absolute_percentage_error, mean_squared_error
@@ -127,8 +129,9 @@ class GradientBoostingRegression(DecisionTreeReg):
         else:
             raise Exception('Argument y must be only pandas Series or numpy ndarray and has some X len')
         self.__y = y
+        self.__y_mean = float(np.mean(y))
         self.__trees = []
-        y_pred = np.full((y.shape[0], ), np.mean(y))
+        y_pred = np.full((y.shape[0], ), self.__y_mean)
         for _ in range(max_trees):
             residual = y - y_pred
             tree = DecisionTreeReg(max_depth=self.__max_depth, 
@@ -143,6 +146,8 @@ class GradientBoostingRegression(DecisionTreeReg):
                     print('MAE', mean_absolute_error(self.__y,y_pred))
                     print('MSE', mean_squared_error(self.__y,y_pred, squared=False))
                     print('RMSE', mean_absolute_percentage_error(self.__y,y_pred), '\n')
+        # all trees are packed into one node table for prediction
+        self.__engine = _TreeEnsemble(trees=[tree.tree_ for tree in self.__trees])
         return self
         
     @_df_check
@@ -160,7 +165,54 @@ class GradientBoostingRegression(DecisionTreeReg):
         y : ndarray of shape (n_samples,)
             The predicted values.
         """
-        y_pred = np.mean(self.__y)
-        for tree in self.__trees:
-            y_pred += self.__learning_rate * tree.predict(X)
-        return np.array(y_pred)
\ No newline at end of file
+        y_pred = self.__y_mean + self.__learning_rate * self.__engine.predict_all(X=X).sum(axis=1)
+        return np.array(y_pred)
+
+    def save(self, 
+            path:str):
+        """Save the fitted model to a binary file.
+
+        The packed node table of all trees is written as raw buffers that
+        load() can map from the file without reading them.
+
+        Parameters
+        ----------
+        path : str
+            File path.
+        """
+        _save_arrays(path=path, 
+                    kind='GradientBoostingRegression', 
+                    params={"learning_rate": self.__learning_rate, 
+                            "max_depth": self.__max_depth, 
+                            "min_samples_split": self.__min_samples_split, 
+                            "y_mean": self.__y_mean}, 
+                    arrays={name: getattr(self.__engine, name) for name in _TreeEnsemble._ARRAYS})
+
+    @classmethod
+    def load(cls, 
+            path:str, 
+            mmap_mode:str or None='r'):
+        """Load a model written by save.
+
+        Parameters
+        ----------
+        path : str
+            File path.
+        mmap_mode : {'r', 'c'} or None, default='r'
+            'r' maps the node table read-only from the file, so processes
+            loading the same file share its pages. None reads it into memory.
+
+        Returns
+        -------
+        model : GradientBoostingRegression
+            Fitted model.
+        """
+        params, arrays = _load_arrays(path=path, 
+                                        kind='GradientBoostingRegression', 
+                                        mmap_mode=mmap_mode)
+        model = cls(learning_rate=params["learning_rate"], 
+                    max_depth=params["max_depth"], 
+                    min_samples_split=params["min_samples_split"])
+        model.__y_mean = params["y_mean"]
+        model.__engine = _TreeEnsemble._from_arrays(arrays=arrays)
+        return model
@@ -1,7 +1,11 @@
+import os
 import numpy as np
 import pandas as pd
-import itertools as it
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from DecisionTree import DecisionTreeClass, DecisionTreeReg
+from TreeEngine import _TreeEnsemble
+from TreeIO import _save_arrays, _load_arrays
 
 def _df_check(func):
     """Decorator for check X argument
@@ -17,35 +21,104 @@ def _df_check(func):
         return func(*args, **kwargs)
     return inner
 
+# training data of a pool worker, set once by _init_worker
+_worker = {}
+
+def _share(array:np.array):
+    """Function to copy an array into a new shared memory block
+
+    Returns:
+        (SharedMemory, tuple): the block and the arguments to map it again
+    """
+    order = 'F' if array.flags.f_contiguous else 'C'
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, order=order)[:] = array
+    return shm, (shm.name, array.shape, array.dtype.str, order)
+
+def _init_worker(forest, 
+                shared:dict, 
+                y:np.array):
+    """Function to attach a pool worker to the training arrays in shared memory
+    """
+    _worker["blocks"] = []
+    for key, (shm_name, shape, dtype, order) in shared.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _worker["blocks"].append(shm)
+        _worker[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, order=order)
+    _worker["y"] = y
+    _worker["forest"] = forest
+
+def _fit_worker_tree(tree_index:int, 
+                    random_state:int):
+    """Function to fit one tree of the forest in a pool worker
+    """
+    return _worker["forest"]._fit_tree(X=_worker["X"], 
+                                        y=_worker["y"], 
+                                        sample_weight=_worker["counts"][tree_index], 
+                                        random_state=random_state)
+
 class _RandomForestTools():
     def __init__(self,
                 max_depth,
                 min_samples_split,
                 n_estimators,
                 sample_method,
-                task:str):
+                task:str,
+                max_features=None,
+                n_jobs=None,
+                random_state=None):
         self.__max_depth = max_depth
         self.__min_samples_split = min_samples_split
         self.__n_estimators = n_estimators
         self.__sample_method = sample_method
         self.__task = task
+        self.__max_features = max_features
+        self.__n_jobs = n_jobs
+        self.__random_state = random_state
     def __bootstrap(self,
-                    x_samples):
+                    x_samples,
+                    rng,
+                    n_trees):
         """Function implementation of bootstrap sampling.
+
+        Returns how often every sample is drawn for n_trees trees, a
+        multinomial draw of x_samples out of x_samples equally likely samples.
         """
-        samples = np.random.choice(a = range(x_samples), size = x_samples)
-        return samples
+        counts = rng.multinomial(n = x_samples, pvals = np.full(x_samples, 1 / x_samples), size = n_trees)
+        return counts
 
     def __poiss(self,
-                x_samples):
+                x_samples,
+                rng,
+                n_trees):
         """Function implementation of Poisson bootstrap sampling.
+
+        Returns how often every sample is drawn for n_trees trees, independent
+        Poisson(1) counts.
         """
-        poisson = np.random.poisson(size = x_samples)
-        new_df_indexes = []
-        for ind, cnt in enumerate(poisson):
-            if cnt != 0:
-                new_df_indexes += it.repeat(ind, cnt)
-        return new_df_indexes
+        counts = rng.poisson(size = (n_trees, x_samples))
+        return counts
+
+    def __sample_counts(self,
+                        x_samples,
+                        rng):
+        """Function to draw the sample counts of all trees into one compact matrix.
+
+        NumPy draws int64 counts, so trees are drawn in chunks of about 2**20
+        counts and copied into a uint8 matrix of shape (n_estimators,
+        x_samples), which is promoted to uint16 only if a count exceeds 255.
+        """
+        method = self.__bootstrap if self.__sample_method == 'bootstrap' else self.__poiss
+        counts = np.empty((self.__n_estimators, x_samples), dtype=np.uint8)
+        chunk = max(1, 2**20 // x_samples)
+        for start in range(0, self.__n_estimators, chunk):
+            draws = method(x_samples = x_samples, 
+                            rng = rng, 
+                            n_trees = min(chunk, self.__n_estimators - start))
+            if draws.max() > np.iinfo(counts.dtype).max:
+                counts = counts.astype(np.uint16)
+            counts[start:start+len(draws)] = draws
+        return counts
     
     def _check_params(self,
                         method_list):
@@ -78,7 +151,60 @@ class _RandomForestTools():
             'Argument sample_method must be only string and bootstrap or poisson'
         else:
             raise Exception('Argument sample_method must be only string and bootstrap or poisson')
-        
+
+        if self.__max_features is None:
+            pass
+        elif isinstance(self.__max_features, str):
+            assert \
+            self.__max_features in ['sqrt', 'log2'], \
+            'Argument max_features must be only string sqrt or log2, integer, float or None'
+        elif isinstance(self.__max_features, int):
+            assert \
+            self.__max_features > 0, \
+            'Argument max_features must be only integer in the range [1, inf)'
+        elif isinstance(self.__max_features, float):
+            assert \
+            (self.__max_features > 0)&(self.__max_features <= 1), \
+            'Argument max_features must be only float in the range (0, 1]'
+        else:
+            raise Exception('Argument max_features must be only string sqrt or log2, integer, float or None')
+
+        if self.__n_jobs is not None:
+            if isinstance(self.__n_jobs, int):
+                assert \
+                self.__n_jobs != 0, \
+                'Argument n_jobs must be only integer or None and not 0'
+            else:
+                raise Exception('Argument n_jobs must be only integer or None')
+
+        if self.__random_state is not None:
+            if isinstance(self.__random_state, int):
+                assert \
+                self.__random_state >= 0, \
+                'Argument random_state must be only integer or None in the range [0, inf)'
+            else:
+                raise Exception('Argument random_state must be only integer or None')
+
+    def _fit_tree(self, 
+                    X:np.array, 
+                    y:np.array, 
+                    sample_weight:np.array, 
+                    random_state:int):
+        """Function to fit one tree with the sample counts of its resample as weights
+
+        Samples that were not drawn have weight 0 and are skipped by the
+        tree, no resampled copy of X is made.
+        """
+        estimator = DecisionTreeClass if self.__task == 'class' else DecisionTreeReg
+        my_tree = estimator(max_depth=self.__max_depth, 
+                            min_samples_split=self.__min_samples_split,
+                            max_features=self.__max_features,
+                            random_state=random_state)
+        my_tree.fit(X=X, 
+                    y=y, 
+                    sample_weight=sample_weight)
+        return my_tree
+
     def _fit(self, 
             X:np.array or pd.DataFrame, 
             y:np.array or pd.Series):
@@ -108,19 +234,76 @@ class _RandomForestTools():
             X = pd.DataFrame(X)
         x_samples, self.n_features = X.shape
         self.feature_names_ = np.array(X.columns)
-        rf_models = []
-        method = self.__bootstrap if self.__sample_method == 'bootstrap' else self.__poiss
-        estimator = DecisionTreeClass if self.__task == 'class' else DecisionTreeReg
-        for _ in range(self.__n_estimators):
-            new_df_indexes = method(x_samples = x_samples)
-            new_X = X.loc[new_df_indexes, :]
-            new_y = y.loc[new_df_indexes]
-            my_tree = estimator(max_depth=self.__max_depth, 
-                                min_samples_split=self.__min_samples_split)
-            my_tree.fit(X=new_X, 
-                        y=new_y)
-            rf_models.append(my_tree)
+        # the trees search features column by column, Fortran order lets them use X without a copy
+        X, y = np.asfortranarray(X, dtype=np.float64), np.asarray(y)
+        # the sample counts of all trees are drawn at once and every tree gets
+        # its own feature seed, so the forest does not depend on the number of workers
+        sample_seed, *tree_seeds = np.random.SeedSequence(self.__random_state).spawn(self.__n_estimators + 1)
+        counts = self.__sample_counts(x_samples = x_samples, 
+                                        rng = np.random.default_rng(sample_seed))
+        random_states = [int(seed.generate_state(1)[0] >> 1) for seed in tree_seeds]
+        n_jobs = self.__n_jobs or 1
+        if n_jobs < 0:
+            n_jobs = os.cpu_count()
+        if n_jobs == 1:
+            rf_models = [self._fit_tree(X=X, y=y, sample_weight=counts[tree_index], random_state=random_state) 
+                        for tree_index, random_state in enumerate(random_states)]
+        else:
+            # the workers map X from shared memory instead of receiving a copy per tree,
+            # they get a forest with the parameters only, not with trees of an earlier fit
+            forest = _RandomForestTools(max_depth=self.__max_depth, 
+                                        min_samples_split=self.__min_samples_split, 
+                                        n_estimators=self.__n_estimators, 
+                                        sample_method=self.__sample_method, 
+                                        task=self.__task, 
+                                        max_features=self.__max_features)
+            blocks, shared = [], {}
+            try:
+                for key, array in [("X", X), ("counts", counts)]:
+                    shm, shared[key] = _share(array=array)
+                    blocks.append(shm)
+                with ProcessPoolExecutor(max_workers=min(n_jobs, self.__n_estimators), 
+                                            initializer=_init_worker, 
+                                            initargs=(forest, shared, y)) as executor:
+                    rf_models = list(executor.map(_fit_worker_tree, range(self.__n_estimators), random_states))
+            finally:
+                for shm in blocks:
+                    shm.close()
+                    shm.unlink()
+        # all trees are packed into one node table for prediction
+        self.__engine = _TreeEnsemble(trees=[model.tree_ for model in rf_models])
         return rf_models
+
+    def _predict_all(self, 
+                    X:np.array or pd.DataFrame)->np.ndarray:
+        """Function to predict every row with every tree
+
+        Returns:
+            np.ndarray: predictions of shape (n_samples, n_estimators)
+        """
+        return self.__engine.predict_all(X=X)
+
+    def _save(self, 
+                path:str, 
+                kind:str):
+        """Function to write the parameters and the packed node table to a binary file
+        """
+        _save_arrays(path=path, 
+                    kind=kind, 
+                    params={"n_estimators": self.__n_estimators, 
+                            "max_depth": self.__max_depth, 
+                            "min_samples_split": self.__min_samples_split, 
+                            "sample_method": self.__sample_method, 
+                            "max_features": self.__max_features, 
+                            "n_jobs": self.__n_jobs, 
+                            "random_state": self.__random_state}, 
+                    arrays={name: getattr(self.__engine, name) for name in _TreeEnsemble._ARRAYS})
+
+    def _load(self, 
+                arrays:dict):
+        """Function to restore the packed node table read by load
+        """
+        self.__engine = _TreeEnsemble._from_arrays(arrays=arrays)
         
 class MyRandomForestRegressor(_RandomForestTools):
     """Regression implementing the Random Forest
@@ -137,19 +320,40 @@ class MyRandomForestRegressor(_RandomForestTools):
 
     sample_method : str, default=bootstrap
         Sampling method. Must be only 'bootstrap' or 'poisson'
+
+    max_features : int, float, {'sqrt', 'log2'} or None, default=None
+        The number of features searched at every split of every tree,
+        drawn at random. A float is a fraction of the features, None means
+        all features.
+
+    n_jobs : int or None, default=None
+        Number of processes that train trees in parallel. The training
+        matrix is shared with them once through shared memory. None means
+        1, -1 means all processors.
+
+    random_state : int or None, default=None
+        Master seed of the forest. Every tree derives its own seed for the
+        resample and the feature draws from it, so a fixed random_state
+        gives the same forest for any n_jobs.
     """
     def __init__(self,
                 n_estimators:int=10,
                 max_depth:int=2, 
                 min_samples_split:int=2,
-                sample_method:str='bootstrap'):
+                sample_method:str='bootstrap',
+                max_features:int or float or str or None=None,
+                n_jobs:int or None=None,
+                random_state:int or None=None):
         self.__n_estimators = n_estimators
         method_list = ['bootstrap', 'poisson']
         super().__init__(max_depth = max_depth,
                         min_samples_split = min_samples_split,
                         n_estimators = self.__n_estimators,
                         sample_method = sample_method,
-                        task = 'class')
+                        task = 'reg',
+                        max_features = max_features,
+                        n_jobs = n_jobs,
+                        random_state = random_state)
         super()._check_params(method_list=method_list)
 
     def fit(self, 
@@ -194,12 +398,11 @@ class MyRandomForestRegressor(_RandomForestTools):
         (isinstance(smooth, int)) | (smooth is None), \
         'Argument smooth must be only integer or None'
         
-        if isinstance(X, pd.DataFrame)==False:   
-            X = pd.DataFrame(X)
         if smooth != None and (smooth>=self.__n_estimators//2 or smooth < 1):
             raise Exception(f"Smooth must be <= {self.__n_estimators//2} and > 0")
 
-        results = [model.predict(X) for model in self.__rf_models]
+        # predictions of every tree, shape (n_estimators, n_samples)
+        results = super()._predict_all(X=X).T
         if smooth != None:
             predict_smooth = smooth
             results = np.sort(np.asarray(results), axis=0)[predict_smooth:-predict_smooth].sum(axis=0)
@@ -209,6 +412,47 @@ class MyRandomForestRegressor(_RandomForestTools):
         final_results = np.array([result/(self.__n_estimators-(predict_smooth *2)) for result in results])
         return np.array(final_results)
 
+    def save(self, 
+            path:str):
+        """Save the fitted forest to a binary file.
+
+        The packed node table of all trees is written as raw buffers that
+        load() can map from the file without reading them.
+
+        Parameters
+        ----------
+        path : str
+            File path.
+        """
+        super()._save(path=path, 
+                        kind='MyRandomForestRegressor')
+
+    @classmethod
+    def load(cls, 
+            path:str, 
+            mmap_mode:str or None='r'):
+        """Load a forest written by save.
+
+        Parameters
+        ----------
+        path : str
+            File path.
+        mmap_mode : {'r', 'c'} or None, default='r'
+            'r' maps the node table read-only from the file, so processes
+            loading the same file share its pages. None reads it into memory.
+
+        Returns
+        -------
+        model : MyRandomForestRegressor
+            Fitted forest.
+        """
+        params, arrays = _load_arrays(path=path, 
+                                        kind='MyRandomForestRegressor', 
+                                        mmap_mode=mmap_mode)
+        model = cls(**params)
+        model._load(arrays=arrays)
+        return model
+
 class MyRandomForestClassifier(_RandomForestTools):
     """Classification implementing the Random Forest
     n_estimators : int, default=100
@@ -224,18 +468,39 @@ class MyRandomForestClassifier(_RandomForestTools):
 
     sample_method : str, default=bootstrap
         Sampling method. Must be only 'bootstrap' or 'poisson'
+
+    max_features : int, float, {'sqrt', 'log2'} or None, default=None
+        The number of features searched at every split of every tree,
+        drawn at random. A float is a fraction of the features, None means
+        all features.
+
+    n_jobs : int or None, default=None
+        Number of processes that train trees in parallel. The training
+        matrix is shared with them once through shared memory. None means
+        1, -1 means all processors.
+
+    random_state : int or None, default=None
+        Master seed of the forest. Every tree derives its own seed for the
+        resample and the feature draws from it, so a fixed random_state
+        gives the same forest for any n_jobs.
     """
     def __init__(self,
                 n_estimators:int=10,
                 max_depth:int=2, 
                 min_samples_split:int=2,
-                sample_method:str='bootstrap'):
+                sample_method:str='bootstrap',
+                max_features:int or float or str or None=None,
+                n_jobs:int or None=None,
+                random_state:int or None=None):
         method_list = ['bootstrap', 'poisson']
         super().__init__(max_depth=max_depth,
                         min_samples_split = min_samples_split,
                         n_estimators = n_estimators,
                         sample_method = sample_method,
-                        task = 'reg')
+                        task = 'class',
+                        max_features = max_features,
+                        n_jobs = n_jobs,
+                        random_state = random_state)
         super()._check_params(method_list=method_list)
 
     def fit(self, 
@@ -273,11 +538,14 @@ class MyRandomForestClassifier(_RandomForestTools):
         y : ndarray of shape (n_samples,)
             The predicted values.
         """
-        if isinstance(X, pd.DataFrame)==False:   
-            X = pd.DataFrame(X)
-        results = [model.predict(X) for model in self.__rf_models]
-        result_data = pd.DataFrame(results)
-        final_results = np.array([result_data[j].mode()[0] for j in result_data])
+        results = np.sort(super()._predict_all(X=X), axis=1)
+        # length of the run of equal predictions ending at every position
+        position = np.arange(results.shape[1])
+        new_run = np.ones(results.shape, dtype=bool)
+        new_run[:, 1:] = results[:, 1:] != results[:, :-1]
+        run_length = position - np.maximum.accumulate(np.where(new_run, position, 0), axis=1) + 1
+        # the first longest run holds the smallest most frequent prediction
+        final_results = results[np.arange(results.shape[0]), np.argmax(run_length, axis=1)]
         return np.array(final_results)
 
     def predict_proba(self, 
@@ -294,9 +562,47 @@ class MyRandomForestClassifier(_RandomForestTools):
         y : ndarray of shape (n_samples,)
             The predicted values.
         """
-        if isinstance(X, pd.DataFrame)==False:   
-            X = pd.DataFrame(X)
-        results = [model.predict(X) for model in self.__rf_models]
-        result_data = pd.DataFrame(results)
-        final_results = np.array([[sum(result_data[j]==0)/len(result_data[j]), sum(result_data[j]==1)/len(result_data[j])] for j in result_data])
-        return np.array(final_results)
\ No newline at end of file
+        results = super()._predict_all(X=X)
+        final_results = np.column_stack((np.mean(results==0, axis=1), np.mean(results==1, axis=1)))
+        return np.array(final_results)
+
+    def save(self, 
+            path:str):
+        """Save the fitted forest to a binary file.
+
+        The packed node table of all trees is written as raw buffers that
+        load() can map from the file without reading them.
+
+        Parameters
+        ----------
+        path : str
+            File path.
+        """
+        super()._save(path=path, 
+                        kind='MyRandomForestClassifier')
+
+    @classmethod
+    def load(cls, 
+            path:str, 
+            mmap_mode:str or None='r'):
+        """Load a forest written by save.
+
+        Parameters
+        ----------
+        path : str
+            File path.
+        mmap_mode : {'r', 'c'} or None, default='r'
+            'r' maps the node table read-only from the file, so processes
+            loading the same file share its pages. None reads it into memory.
+
+        Returns
+        -------
+        model : MyRandomForestClassifier
+            Fitted forest.
+        """
+        params, arrays = _load_arrays(path=path, 
+                                        kind='MyRandomForestClassifier', 
+                                        mmap_mode=mmap_mode)
+        model = cls(**params)
+        model._load(arrays=arrays)
+        return model
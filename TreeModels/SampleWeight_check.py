@@ -0,0 +1,27 @@
+import numpy as np
+from sklearn.datasets import make_regression
+from sklearn.tree import DecisionTreeRegressor
+from DecisionTree import DecisionTreeReg
+
+# Create dataset
+seed = 42
+X, y = make_regression(n_samples=800, n_features=4, noise=10, random_state=seed)
+X_test = X[:400]
+rng = np.random.default_rng(seed)
+weight = rng.integers(0, 4, size=len(y)).astype(float)
+repeat = np.repeat(np.arange(len(y)), weight.astype(int))
+
+print("SAMPLE WEIGHT CHECK")
+
+#Integer weights against repeated rows
+for params in [dict(criterion='squared_error'), dict(criterion='absolute_error'), 
+                dict(criterion='quantile', alpha=0.3), dict(criterion='quantile', alpha=0.9)]:
+    weighted = DecisionTreeReg(max_depth=4, **params).fit(X=X, y=y, sample_weight=weight).predict(X_test)
+    repeated = DecisionTreeReg(max_depth=4, **params).fit(X=X[repeat], y=y[repeat]).predict(X_test)
+    print(params, 'weighted vs repeated max abs diff', np.abs(weighted - repeated).max())
+
+#Weighted absolute error against sklearn, its max_depth counts the root as depth one
+weight = rng.random(size=len(y)) * 2
+pred = DecisionTreeReg(max_depth=3, criterion='absolute_error').fit(X=X, y=y, sample_weight=weight).predict(X_test)
+sk_pred = DecisionTreeRegressor(max_depth=4, criterion='absolute_error').fit(X=X, y=y, sample_weight=weight).predict(X_test)
+print('weighted absolute_error vs sklearn max abs diff', np.abs(pred - sk_pred).max())
@@ -0,0 +1,169 @@
+import numpy as np
+
+class _TreeEnsemble():
+    """Inference engine evaluating many fitted trees at once.
+
+    The node arrays of all trees are packed into one contiguous table:
+    int32 features and children, float64 thresholds and one value array.
+    Children are global node indices and roots holds the index of the root
+    of every tree. A batch of rows is expanded into (row, tree) pairs that
+    all descend one level per iteration, so the Python loop runs once per
+    level of the deepest tree instead of once per tree.
+
+    Blocks of rows that are exactly representable in float32 are compared
+    in float32 against the thresholds rounded down to the largest float32
+    not above them, which takes the same path as float64. Other blocks are
+    compared in float64, so every row takes exactly the path of the fitted
+    tree.
+
+    Parameters
+    ----------
+    trees : list of _Tree
+        Compiled trees of the ensemble, all with the same kind of leaf values.
+
+    block_size : int, default=32768
+        Number of (row, tree) pairs evaluated together. Small blocks keep
+        the working arrays in cache.
+    """
+    # names of the packed table arrays, written by save() of the ensembles
+    _ARRAYS = ('roots', 'feature', 'threshold', 'left', 'right', 'value', 'missing_left', 'cat_split', 'cat_table')
+
+    def __init__(self,
+                trees:list,
+                block_size:int=32768):
+        self.n_trees = len(trees)
+        self.block_size = block_size
+        sizes = np.array([tree.n_nodes for tree in trees])
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        cat_sizes = np.array([tree.cat_table.shape[0] for tree in trees])
+        cat_offsets = np.concatenate(([0], np.cumsum(cat_sizes)[:-1]))
+        self.roots = offsets.astype(np.int32)
+        self.feature = np.concatenate([tree.feature for tree in trees]).astype(np.int32)
+        self.threshold = np.concatenate([tree.threshold for tree in trees]).astype(np.float64)
+        # leaves keep -1, internal children are shifted to global indices
+        self.left = np.concatenate([np.where(tree.left >= 0, tree.left + offset, -1) for tree, offset in zip(trees, offsets)]).astype(np.int32)
+        self.right = np.concatenate([np.where(tree.right >= 0, tree.right + offset, -1) for tree, offset in zip(trees, offsets)]).astype(np.int32)
+        self.value = np.concatenate([tree.value for tree in trees])
+        self.missing_left = np.concatenate([tree.missing_left for tree in trees])
+        self.cat_split = np.concatenate([np.where(tree.cat_split >= 0, tree.cat_split + offset, -1) for tree, offset in zip(trees, cat_offsets)]).astype(np.int32)
+        self.cat_table = np.zeros((int(cat_sizes.sum()), max(tree.cat_table.shape[1] for tree in trees)), dtype=bool)
+        for tree, offset in zip(trees, cat_offsets):
+            self.cat_table[offset:offset+tree.cat_table.shape[0], :tree.cat_table.shape[1]] = tree.cat_table
+        self.n_nodes = len(self.feature)
+        self.__prepare()
+
+    @classmethod
+    def _from_arrays(cls,
+                    arrays:dict,
+                    block_size:int=32768):
+        """Function to restore an engine from its packed table, e.g. memory mapped arrays
+
+        Args:
+            arrays (dict): Arrays by the names in _ARRAYS
+
+        Returns:
+            _TreeEnsemble: Engine sharing the given arrays
+        """
+        engine = cls.__new__(cls)
+        for name in cls._ARRAYS:
+            setattr(engine, name, arrays[name])
+        engine.n_trees = len(engine.roots)
+        engine.n_nodes = len(engine.feature)
+        engine.block_size = block_size
+        engine.__prepare()
+        return engine
+
+    def __prepare(self):
+        '''Function to derive the arrays of the descent from the packed table
+
+        Leaves point to themselves on feature 0, so every pair can take
+        max_depth steps without tracking which pairs already stopped. The
+        children are interleaved as (right, left) and NumPy indexes fastest
+        with intp, so the descent keeps intp copies of the index columns.
+        '''
+        threshold = np.asarray(self.threshold, dtype=np.float64)
+        self.__threshold32 = threshold.astype(np.float32)
+        # float32 rounding to nearest may land above the threshold, step one float down
+        above = self.__threshold32.astype(np.float64) > threshold
+        self.__threshold32[above] = np.nextafter(self.__threshold32[above], np.float32(-np.inf))
+        is_leaf = self.feature < 0
+        node_index = np.arange(self.n_nodes)
+        self.__feature = np.where(is_leaf, 0, self.feature).astype(np.intp)
+        self.__children = np.empty(2 * self.n_nodes, dtype=np.intp)
+        self.__children[0::2] = np.where(is_leaf, node_index, self.right)
+        self.__children[1::2] = np.where(is_leaf, node_index, self.left)
+        # depth of the deepest leaf, walked level by level from the roots
+        self.max_depth = 0
+        level = self.roots[self.feature[self.roots] >= 0]
+        while len(level) > 0:
+            self.max_depth += 1
+            level = np.concatenate((self.left[level], self.right[level]))
+            level = level[self.feature[level] >= 0]
+
+    def __descend(self,
+                    X:np.array,
+                    node:np.array):
+        '''Function to move (row, tree) pairs of a row block down to their leaves
+
+        Args:
+            X : float32 or float64 block of rows
+            node : pairs ordered by row then tree, replaced by the leaf index
+
+        Returns:
+            np.ndarray: leaf index of every pair
+        '''
+        n_features = X.shape[1]
+        threshold = self.__threshold32 if X.dtype == np.float32 else self.threshold
+        X = X.ravel()
+        row_offset = np.repeat(np.arange(len(node) // self.n_trees) * n_features, self.n_trees)
+        for _ in range(self.max_depth):
+            feature_values = X[row_offset + self.__feature[node]]
+            go_left = feature_values <= threshold[node]
+            go_left |= np.isnan(feature_values) & self.missing_left[node]
+            if self.cat_table.shape[0] > 0:
+                is_cat = np.flatnonzero(self.cat_split[node] >= 0)
+                codes = feature_values[is_cat]
+                # unknown categories are treated like missing values
+                known = (codes >= 0) & (codes < self.cat_table.shape[1])
+                cat_left = self.missing_left[node[is_cat]]
+                cat_left[known] = self.cat_table[self.cat_split[node[is_cat]][known], codes[known].astype(np.intp)]
+                go_left[is_cat] = cat_left
+            node = self.__children[2 * node + go_left]
+        return node
+
+    def apply(self,
+                X:np.array)->np.ndarray:
+        """Function to find the leaf of every row in every tree
+
+        Args:
+            X : ndarray of shape (n_samples, n_features)
+
+        Returns:
+            np.ndarray: global leaf indices of shape (n_samples, n_trees)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        leaves = np.empty((X.shape[0], self.n_trees), dtype=np.intp)
+        rows_per_block = max(1, self.block_size // self.n_trees)
+        roots = self.roots.astype(np.intp)
+        for start in range(0, X.shape[0], rows_per_block):
+            block = X[start:start+rows_per_block]
+            block32 = block.astype(np.float32)
+            # float32 rows halve the memory traffic, other rows keep their precision
+            if np.array_equal(block32, block, equal_nan=True):
+                block = block32
+            node = self.__descend(X=block,
+                                    node=np.tile(roots, len(block)))
+            leaves[start:start+len(block)] = node.reshape(len(block), self.n_trees)
+        return leaves
+
+    def predict_all(self,
+                    X:np.array)->np.ndarray:
+        """Function to predict every row with every tree
+
+        Args:
+            X : ndarray of shape (n_samples, n_features)
+
+        Returns:
+            np.ndarray: leaf values of shape (n_samples, n_trees)
+        """
+        return self.value[self.apply(X=X)]
@@ -0,0 +1,41 @@
+import time
+import numpy as np
+from sklearn.datasets import make_regression
+from DecisionTree import DecisionTreeReg
+from TreeEngine import _TreeEnsemble
+
+# Create dataset
+seed = 42
+X, y = make_regression(n_samples=20000, n_features=10, random_state=seed)
+X_test = X[:10000]
+
+#Fit an ensemble of trees on bootstrap weights
+rng = np.random.default_rng(seed)
+trees = [DecisionTreeReg(max_depth=7, max_bins=64).fit(X=X, y=y, sample_weight=rng.poisson(size=len(y))) 
+         for _ in range(100)]
+engine = _TreeEnsemble(trees=[tree.tree_ for tree in trees])
+
+#Current path: one tree after another
+start = time.perf_counter()
+loop_pred = np.column_stack([tree.predict(X_test) for tree in trees])
+loop_time = time.perf_counter() - start
+
+#Packed node table: all trees at once
+start = time.perf_counter()
+engine_pred = engine.predict_all(X=X_test)
+engine_time = time.perf_counter() - start
+
+print("TREE ENGINE BENCHMARK")
+print('trees', len(trees), 'nodes', engine.n_nodes)
+print('loop rows/sec', round(len(X_test) / loop_time))
+print('engine rows/sec', round(len(X_test) / engine_time))
+print('max abs diff', np.abs(loop_pred - engine_pred).max(), '\n')
+
+#Float64-dense input: a timestamp-like feature with exact trees
+X_time = np.column_stack((1.7e9 + rng.uniform(0, 86400, size=2000), rng.normal(size=2000)))
+y_time = np.sin(X_time[:, 0] / 3600) + X_time[:, 1]
+trees = [DecisionTreeReg(max_depth=7).fit(X=X_time, y=y_time, sample_weight=rng.poisson(size=len(y_time))) 
+         for _ in range(20)]
+engine = _TreeEnsemble(trees=[tree.tree_ for tree in trees])
+loop_pred = np.column_stack([tree.predict(X_time) for tree in trees])
+print('timestamp feature max abs diff', np.abs(loop_pred - engine.predict_all(X=X_time)).max())
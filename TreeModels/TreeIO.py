@@ -0,0 +1,88 @@
+import json
+import numpy as np
+
+_MAGIC = b'MLTREES\x00'
+_VERSION = 1
+_ALIGN = 64
+
+def _aligned(size:int)->int:
+    """Function to round a byte size up to the buffer alignment
+    """
+    return -(-size // _ALIGN) * _ALIGN
+
+def _save_arrays(path:str,
+                kind:str,
+                params:dict,
+                arrays:dict):
+    """Function to write model parameters and named arrays to one binary file
+
+    Layout: 8 byte magic, uint32 format version, uint32 header length,
+    JSON header with the model kind, parameters and the dtype, shape and
+    offset of every array, then the raw C-ordered buffers, each aligned to
+    64 bytes so they can be memory mapped in place.
+
+    Args:
+        path (str): File path
+        kind (str): Model class name checked on load
+        params (dict): JSON serializable model parameters
+        arrays (dict): Arrays by name
+    """
+    header = {"kind": kind, "params": params, "arrays": {}}
+    offset = 0
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    for name, array in arrays.items():
+        assert \
+        array.dtype != object, \
+        f'Array {name} of {kind} must not hold python objects to be saved'
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += _aligned(array.nbytes)
+    header_bytes = json.dumps(header).encode()
+    data_start = _aligned(len(_MAGIC) + 8 + len(header_bytes))
+    with open(path, 'wb') as file:
+        file.write(_MAGIC)
+        file.write(np.array([_VERSION, len(header_bytes)], dtype='<u4').tobytes())
+        file.write(header_bytes)
+        for name, array in arrays.items():
+            file.seek(data_start + header["arrays"][name]["offset"])
+            file.write(array.tobytes())
+        file.truncate(data_start + offset)
+
+def _load_arrays(path:str,
+                kind:str,
+                mmap_mode:str or None='r'):
+    """Function to read a file written by _save_arrays
+
+    Args:
+        path (str): File path
+        kind (str): Expected model class name
+        mmap_mode (str or None): 'r' or 'c' maps the buffers from the file
+            without reading them, None reads them into memory. Defaults to 'r'
+
+    Returns:
+        (dict, dict): model parameters and arrays by name
+    """
+    assert \
+    mmap_mode in ['r', 'c', None], \
+    'Argument mmap_mode must be only r, c or None'
+    with open(path, 'rb') as file:
+        assert \
+        file.read(len(_MAGIC)) == _MAGIC, \
+        f'File {path} is not a saved tree model'
+        version, header_len = np.frombuffer(file.read(8), dtype='<u4')
+        assert \
+        version <= _VERSION, \
+        f'File {path} has format version {version}, only versions up to {_VERSION} can be read'
+        header = json.loads(file.read(int(header_len)))
+    assert \
+    header["kind"] == kind, \
+    f'File {path} holds a {header["kind"]} model, not {kind}'
+    data_start = _aligned(len(_MAGIC) + 8 + int(header_len))
+    arrays = {}
+    for name, info in header["arrays"].items():
+        dtype, shape = np.dtype(info["dtype"]), tuple(info["shape"])
+        # empty buffers can not be mapped
+        if mmap_mode is None or int(np.prod(shape)) == 0:
+            arrays[name] = np.fromfile(path, dtype=dtype, count=int(np.prod(shape)), offset=data_start + info["offset"]).reshape(shape)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=data_start + info["offset"], shape=shape)
+    return header["params"], arrays